@@ -6,12 +6,16 @@ app = FastAPI(title="Open-AutoGLM GUI", version="1.0.0")
 
 @app.on_event("startup")
 async def startup_event():
-    """Clean up any leftover scrcpy connections on startup."""
+    """Clean up leftover scrcpy connections and task screenshots on startup."""
     try:
         from phone_agent.adb.scrcpy_capture import cleanup_all_scrcpy
         cleanup_all_scrcpy()
     except Exception as e:
         print(f"[App] Error cleaning up scrcpy on startup: {e}", flush=True)
+    
+    # Done here rather than in TaskManager() so importing the services doesn't delete files
+    from .services.task_manager import task_manager
+    task_manager.clear_stale_screenshots()
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -8,7 +8,7 @@ from pydantic import BaseModel
 from typing import Optional, AsyncGenerator
 from ..services.device_manager import device_manager
 from ..services.screen_streamer import screen_streamer
-from ..services.stream_manager import stream_manager
+from ..services.stream_manager import stream_manager, is_precompressed
 from ..services.recording_manager import recording_manager
 from ..services.video_streamer import video_streamer
 from phone_agent.device_factory import get_device_factory, set_device_type, DeviceType
@@ -52,7 +52,7 @@ def _get_device_module():
     # Check if WebRTC (safely handle missing keys)
     is_webrtc = False
     try:
-        is_webrtc = any(d.get('id') == device_id for d in device_manager.webrtc_devices)
+        is_webrtc = device_id in device_manager.webrtc_devices
     except (KeyError, TypeError, AttributeError) as e:
         print(f"[_get_device_module] Error checking WebRTC devices: {e}", flush=True)
         is_webrtc = False
@@ -189,9 +189,9 @@ async def get_latest_frame(request: Request):
             # Wait for first frame capture (max 1 second, check every 100ms)
             for _ in range(10):
                 await asyncio.sleep(0.1)
-                with screen_streamer._frame_lock:
-                    if screen_streamer.latest_frame and screen_streamer.latest_frame_ts > 0:
-                        break
+                frame, frame_ts = screen_streamer.latest_frame_snapshot()
+                if frame and frame_ts > 0:
+                    break
     
     # Asynchronously capture frame on demand (in thread pool)
     # If streaming is active, this will return cached frame immediately
@@ -206,9 +206,9 @@ async def get_latest_frame(request: Request):
         if client_etag and client_etag == frame_hash:
             return Response(status_code=304)
         
-        # Check if client supports gzip compression
+        # Check if client supports gzip compression (pointless for JPEG data)
         accept_encoding = request.headers.get("accept-encoding", "").lower()
-        use_gzip = "gzip" in accept_encoding
+        use_gzip = "gzip" in accept_encoding and not is_precompressed(frame)
         
         # Compress frame data if client supports gzip
         content = frame
@@ -234,25 +234,26 @@ async def get_latest_frame(request: Request):
         # Even if content unchanged, return the frame with updated timestamp
         # This ensures real-time frame delivery - every captured frame is available
         # Frontend can use timestamp to determine if it's a new frame
-        if screen_streamer.latest_frame:
-            frame_hash = hashlib.md5(screen_streamer.latest_frame).hexdigest()
+        latest, latest_ts = screen_streamer.latest_frame_snapshot()
+        if latest:
+            frame_hash = hashlib.md5(latest).hexdigest()
             client_etag = request.headers.get("if-none-match")
             
             if client_etag and client_etag == frame_hash:
                 return Response(status_code=304)
             
             accept_encoding = request.headers.get("accept-encoding", "").lower()
-            use_gzip = "gzip" in accept_encoding
+            use_gzip = "gzip" in accept_encoding and not is_precompressed(latest)
             
-            content = screen_streamer.latest_frame
+            content = latest
             headers = {
                 "Cache-Control": "no-cache",
                 "ETag": frame_hash,
-                "X-Timestamp": str(int(screen_streamer.latest_frame_ts * 1000))
+                "X-Timestamp": str(int(latest_ts * 1000))
             }
             
             if use_gzip:
-                content = gzip.compress(screen_streamer.latest_frame, compresslevel=6)
+                content = gzip.compress(latest, compresslevel=6)
                 headers["Content-Encoding"] = "gzip"
                 headers["Vary"] = "Accept-Encoding"
             
@@ -333,20 +334,19 @@ async def _generate_mjpeg_stream() -> AsyncGenerator[bytes, None]:
             elif status == 'unchanged':
                 # Frame unchanged but we have a cached frame, send it to maintain stream continuity
                 # Get the cached frame
-                with screen_streamer._frame_lock:
-                    cached_frame = screen_streamer.latest_frame
-                    if cached_frame:
-                        frame_data = (
-                            boundary +
-                            b'Content-Type: image/jpeg\r\n' +
-                            b'Content-Length: ' + str(len(cached_frame)).encode() + b'\r\n\r\n' +
-                            cached_frame +
-                            b'\r\n'
-                        )
-                        yield frame_data
-                    else:
-                        # No cached frame, wait before next check
-                        await asyncio.sleep(frame_interval)
+                cached_frame = screen_streamer.latest_frame
+                if cached_frame:
+                    frame_data = (
+                        boundary +
+                        b'Content-Type: image/jpeg\r\n' +
+                        b'Content-Length: ' + str(len(cached_frame)).encode() + b'\r\n\r\n' +
+                        cached_frame +
+                        b'\r\n'
+                    )
+                    yield frame_data
+                else:
+                    # No cached frame, wait before next check
+                    await asyncio.sleep(frame_interval)
             elif status == 'locked':
                 # Device locked, wait longer
                 consecutive_errors += 1
@@ -409,14 +409,17 @@ async def stream_websocket(websocket: WebSocket):
         while True:
             try:
                 # Wait for any message from client (ping/pong or close)
-                data = await asyncio.wait_for(websocket.receive_text(), timeout=30.0)
+                data = await asyncio.wait_for(websocket.receive_text(), timeout=20.0)
                 # Client can send ping messages to keep connection alive
                 if data == "ping":
                     await websocket.send_text("pong")
             except asyncio.TimeoutError:
-                # Send ping to keep connection alive
+                if websocket not in stream_manager.frame_connections:
+                    # Frame writer already dropped this client (send failed or stalled)
+                    break
+                # Send ping to keep connection alive; a peer that can't take it is dead
                 try:
-                    await websocket.send_text("ping")
+                    await asyncio.wait_for(websocket.send_text("ping"), timeout=5.0)
                 except Exception:
                     break
             except WebSocketDisconnect:
@@ -427,13 +430,22 @@ async def stream_websocket(websocket: WebSocket):
         stream_manager.disconnect_frame_stream(websocket)
 
 
+# Container query values for /stream/video -> response media type
+_VIDEO_MEDIA_TYPES = {
+    "mp4": "video/mp4",
+    "mkv": "video/x-matroska",
+}
+
 @router.get("/stream/video")
-async def get_video_stream():
+async def get_video_stream(container: str = "mp4"):
     """
     HTTP endpoint for fragmented MP4 video streaming.
     Provides real-time video stream from scrcpy via HTTP chunked transfer.
     Uses ffmpeg to convert H.264 to fragmented MP4 for browser playback via MSE API.
     
+    ?container=mkv streams scrcpy's Matroska recording without remuxing, for
+    clients that play MKV directly (e.g. ffplay/VLC); MSE in browsers needs mp4.
+    
     Client should use MSE (MediaSource Extensions) API to play the stream:
     ```javascript
     const mediaSource = new MediaSource();
@@ -446,6 +458,10 @@ async def get_video_stream():
     });
     ```
     """
+    media_type = _VIDEO_MEDIA_TYPES.get(container)
+    if media_type is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported container: {container}")
+    
     device_id = device_manager.active_device_id
     print(f"[Control] Video stream request received, device_id={device_id}", flush=True)
     
@@ -459,14 +475,14 @@ async def get_video_stream():
     
     print(f"[Control] Starting video stream for device: {device_id}", flush=True)
     return StreamingResponse(
-        video_streamer.generate_mp4_stream(device_id=device_id),
-        media_type="video/mp4",
+        video_streamer.generate_mp4_stream(device_id=device_id, container=container),
+        media_type=media_type,
         headers={
             "Cache-Control": "no-cache, no-store, must-revalidate",
             "Pragma": "no-cache",
             "Expires": "0",
             "Connection": "keep-alive",
             "Transfer-Encoding": "chunked",
-            "Content-Type": "video/mp4"
+            "Content-Type": media_type
         }
     )
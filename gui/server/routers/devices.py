@@ -72,10 +72,9 @@ async def webrtc_connect(websocket: WebSocket, token: str):
         device_manager.handle_webrtc_disconnect(token)
         # If this was the active device, stop streaming
         if device_manager.active_device_id:
-            for d in device_manager.webrtc_devices:
-                if d.get("token") == token and d.get("id") == device_manager.active_device_id:
-                    screen_streamer.stop_streaming()
-                    break
+            d = device_manager.get_webrtc_device_by_token(token)
+            if d and d.get("id") == device_manager.active_device_id:
+                screen_streamer.stop_streaming()
 
 @router.get("/", response_model=List[DeviceInfo])
 async def get_devices():
@@ -156,11 +156,7 @@ async def get_recording_status(device_id: str):
 async def preview_recording(recording_id: str):
     """Get preview of an unsaved recording (actions list)."""
     # Try to find the recording in active recordings
-    recording_data = None
-    for device_id, data in list(recording_manager._active_recordings.items()):
-        if data.get("id") == recording_id:
-            recording_data = data
-            break
+    recording_data = recording_manager.get_active_recording_by_id(recording_id)
     
     if not recording_data:
         raise HTTPException(status_code=404, detail="Recording not found")
@@ -235,7 +231,7 @@ async def list_recordings(device_id: Optional[str] = None, keyword: Optional[str
                 "keywords": r.keywords,
                 "device_id": r.device_id,
                 "device_type": r.device_type,
-                "action_count": len(r.actions),
+                "action_count": r.action_count,
                 "created_at": r.created_at,
                 "updated_at": r.updated_at,
                 "description": r.description,
@@ -293,11 +289,7 @@ def _get_recording_object(recording_id: str) -> Optional[Recording]:
     
     # If not found, try to get from active (unsaved) recordings
     if not recording:
-        recording_data = None
-        for device_id, data in recording_manager._active_recordings.items():
-            if data["id"] == recording_id:
-                recording_data = data
-                break
+        recording_data = recording_manager.get_active_recording_by_id(recording_id)
         
         if recording_data:
             # Create a temporary Recording object from active recording data
@@ -435,11 +427,7 @@ async def replace_action(recording_id: str, req: ReplaceActionRequest):
     """Replace an action in a recording (for re-recording)."""
     try:
         # Check if it's an active (unsaved) recording
-        recording_data = None
-        for device_id, data in recording_manager._active_recordings.items():
-            if data["id"] == recording_id:
-                recording_data = data
-                break
+        recording_data = recording_manager.get_active_recording_by_id(recording_id)
         
         if not recording_data:
             raise HTTPException(status_code=404, detail="Recording not found or already saved. Can only replace actions in unsaved recordings.")
@@ -1,11 +1,33 @@
-from fastapi import APIRouter, HTTPException
+from collections import deque
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
-from gui.server.services.task_manager import task_manager, AgentTask
+from gui.server.services.task_manager import task_manager, AgentTaskModel
 from gui.server.services.agent_runner import agent_runner
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Fall back to FastAPI's response_model serialization
+
 router = APIRouter()
 
+def _orjson_default(obj):
+    if isinstance(obj, deque):
+        return list(obj)  # AgentTask.logs
+    raise TypeError
+
+def _task_response(content):
+    """Serialize task dataclasses straight to JSON with orjson when available.
+    
+    This skips FastAPI's asdict copy and response_model validation of every log
+    entry; the output matches the declared response_model.
+    """
+    if orjson is None:
+        return content
+    return Response(orjson.dumps(content, default=_orjson_default), media_type="application/json")
+
 class CreateTaskRequest(BaseModel):
     id: Optional[str] = None # Allow explicit ID (for session sync)
     device_id: str
@@ -15,11 +37,11 @@ class CreateTaskRequest(BaseModel):
     details: Optional[str] = None
 
 class TaskResponse(BaseModel):
-    task: AgentTask
+    task: AgentTaskModel
 
-@router.get("/{device_id}", response_model=List[AgentTask])
+@router.get("/{device_id}", response_model=List[AgentTaskModel])
 async def list_device_tasks(device_id: str):
-    return task_manager.list_tasks(device_id)
+    return _task_response(task_manager.list_tasks(device_id))
 
 @router.post("/", response_model=TaskResponse)
 async def create_task(req: CreateTaskRequest):
@@ -31,14 +53,22 @@ async def create_task(req: CreateTaskRequest):
         role=req.role,
         details=req.details
     )
-    return {"task": task}
+    return _task_response({"task": task})
 
 @router.get("/detail/{task_id}", response_model=TaskResponse)
 async def get_task(task_id: str):
     task = task_manager.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return {"task": task}
+    return _task_response({"task": task})
+
+# :path because task ids are URL-quoted and may decode to contain "/"
+@router.get("/{task_id:path}/screens/{seq}.jpg")
+async def get_task_screenshot(task_id: str, seq: int):
+    path = task_manager.get_screenshot_path(task_id, seq)
+    if not path:
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+    return FileResponse(path, media_type="image/jpeg")
 
 class UpdateTaskRequest(BaseModel):
     name: Optional[str] = None
@@ -49,7 +79,7 @@ async def update_task(task_id: str, req: UpdateTaskRequest):
     task = task_manager.update_task(task_id, name=req.name, details=req.details)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return {"task": task}
+    return _task_response({"task": task})
 
 class StartTaskRequest(BaseModel):
     prompt: Optional[str] = None
@@ -1,5 +1,6 @@
 import threading
 import asyncio
+import base64
 import traceback
 import json
 import time
@@ -17,6 +18,13 @@ from .screen_streamer import screen_streamer
 from .config_manager import config_manager
 from .recording_manager import recording_manager
 
+try:
+    import pybase64
+except ImportError:
+    pybase64 = None  # Fall back to stdlib base64
+
+_b64encode = pybase64.b64encode if pybase64 is not None else base64.b64encode
+
 class AgentRunner:
     _instance = None
     
@@ -453,6 +461,25 @@ class AgentRunner:
                 self.main_loop
             )
 
+    def _emit_terminal(self, task_id: str, level: str, message: str, status: str):
+        """Emit the final log entry and task state as a single broadcast."""
+        if message and message.strip():
+            task_manager.add_log(task_id, level, message)
+        
+        if self.main_loop and self.main_loop.is_running():
+            asyncio.run_coroutine_threadsafe(
+                stream_manager.broadcast({
+                    "type": "terminal",
+                    "taskId": task_id,
+                    "level": level,
+                    "message": message,
+                    "state": status
+                }),
+                self.main_loop
+            )
+        else:
+            print(f"[{task_id}] {level}: {message}")
+
     def start_session(self, task_id: str, prompt_override: str = None, installed_apps: list = None):
         task = task_manager.get_task(task_id)
         if not task:
@@ -601,7 +628,7 @@ class AgentRunner:
         prompt = prompt_override if prompt_override else task.details
         
         # ... existing ...
-        is_webrtc = any(d['id'] == device_id for d in device_manager.webrtc_devices)
+        is_webrtc = device_id in device_manager.webrtc_devices
         if is_webrtc:
             set_device_type(DeviceType.WEBRTC)
         else:
@@ -657,7 +684,7 @@ class AgentRunner:
                     "name": rec.name,
                     "keywords": rec.keywords,
                     "description": rec.description,
-                    "action_count": len(rec.actions)
+                    "action_count": rec.action_count
                 })
             
             # Status callback for long-running tasks (e.g., app installation)
@@ -837,9 +864,8 @@ class AgentRunner:
                     self._handle_step_result(task.id, result)
             
             if stop_event.is_set():
-                 self._emit_log(task.id, "warn", "Task stopped by user.")
                  task_manager.update_status(task.id, "stopped")
-                 self._emit_status(task.id, "stopped")
+                 self._emit_terminal(task.id, "warn", "Task stopped by user.", "stopped")
             elif task.type != 'background' and result.finished:
                  # Check if task completed successfully or failed
                  # Check both result.success and message content for failure indicators
@@ -856,23 +882,21 @@ class AgentRunner:
                      # Task completed successfully
                      # Only log if finish_message is not empty
                      if finish_message and finish_message.strip():
-                         self._emit_log(task.id, "success", f"Task completed: {finish_message}")
+                         completion_message = f"Task completed: {finish_message}"
                      else:
-                         self._emit_log(task.id, "success", "Task completed")
+                         completion_message = "Task completed"
                      task_manager.update_status(task.id, "completed")
-                     self._emit_status(task.id, "completed")
+                     self._emit_terminal(task.id, "success", completion_message, "completed")
             elif task.type != 'background':
                  # Task cannot be completed - reached max steps
-                 self._emit_log(task.id, "error", "无法完成任务：已达到最大执行步数，任务可能过于复杂或无法在当前条件下完成。")
                  task_manager.update_status(task.id, "error")
-                 self._emit_status(task.id, "error")
+                 self._emit_terminal(task.id, "error", "无法完成任务：已达到最大执行步数，任务可能过于复杂或无法在当前条件下完成。", "error")
             
         except Exception as e:
             traceback.print_exc()
             error_msg = str(e)
-            self._emit_log(task.id, "error", f"Task failed: {error_msg}")
             task_manager.update_status(task.id, "error")
-            self._emit_status(task.id, "error")
+            self._emit_terminal(task.id, "error", f"Task failed: {error_msg}", "error")
         finally:
             if task.id in self.active_tasks:
                 task_data = self.active_tasks[task.id]
@@ -897,8 +921,7 @@ class AgentRunner:
                         return screenshot.base64_data
                     # Fallback: try screen_streamer if direct capture fails
                     if screen_streamer.latest_frame:
-                        import base64
-                        return base64.b64encode(screen_streamer.latest_frame).decode('utf-8')
+                        return _b64encode(screen_streamer.latest_frame).decode('utf-8')
         except Exception as e:
             # Don't fail if screenshot capture fails, but log for debugging
             # print(f"[AgentRunner] Failed to get screenshot for task {task_id}: {e}")
@@ -1,13 +1,101 @@
+import logging
+import re
 import time
 import uuid
 import socket
 import subprocess
-from typing import Optional, List, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, List, Dict, Tuple
 from pydantic import BaseModel
 import shutil
 from phone_agent.adb import list_devices as adb_list_devices, ADBConnection
 from phone_agent.hdc import list_devices as hdc_list_devices, HDCConnection
 
+try:
+    import psutil
+except ImportError:
+    psutil = None  # Optional: enables DNS-free local IP detection
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between PATH searches for a missing adb/hdc
+_PATH_PROBE_INTERVAL = 30
+
+# Seconds before the detected local IP is considered stale
+_LOCAL_IP_TTL = 60
+
+# Map common brand variations to standard names
+_BRAND_MAP = {
+    "huawei": "华为",
+    "honor": "荣耀",
+    "xiaomi": "小米",
+    "redmi": "红米",
+    "oppo": "OPPO",
+    "oneplus": "一加",
+    "vivo": "vivo",
+    "iqoo": "iQOO",
+    "samsung": "三星",
+    "meizu": "魅族",
+    "realme": "realme",
+    "motorola": "摩托罗拉",
+    "lenovo": "联想",
+    "zte": "中兴",
+    "coolpad": "酷派",
+    "gionee": "金立",
+    "nubia": "努比亚",
+    "smartisan": "锤子",
+    "360": "360",
+    "leeco": "乐视",
+}
+# Longest keys first so partial matching prefers the most specific brand
+_BRAND_KEYS = sorted(_BRAND_MAP, key=len, reverse=True)
+
+# Interfaces for containers, VMs and tunnels, whose addresses phones on the LAN can't reach
+_VIRTUAL_IFACE_PREFIXES = ("docker", "br-", "veth", "virbr", "vboxnet", "vmnet", "tun", "tap", "utun", "zt", "tailscale")
+_VIRTUAL_IFACE_MARKERS = ("virtualbox", "vmware", "vethernet", "hyper-v")
+
+def _is_virtual_interface(name: str) -> bool:
+    """True for bridge, tunnel and virtual adapter names (Linux, macOS and Windows)."""
+    name_lower = name.lower()
+    return name_lower.startswith(_VIRTUAL_IFACE_PREFIXES) or any(
+        marker in name_lower for marker in _VIRTUAL_IFACE_MARKERS
+    )
+
+@lru_cache(maxsize=64)
+def _normalize_brand_cached(brand: str) -> str:
+    """Normalize a raw brand string; results are cached since brands repeat across polls."""
+    brand_stripped = brand.strip()
+    brand_lower = brand_stripped.lower()
+    
+    # Check exact match first
+    value = _BRAND_MAP.get(brand_lower)
+    if value is not None:
+        return value
+    
+    # Check partial match
+    for key in _BRAND_KEYS:
+        if key in brand_lower or brand_lower in key:
+            return _BRAND_MAP[key]
+    
+    # Return capitalized original if no match
+    return brand_stripped.title()
+
+# A brand key at the start of a product name, not followed by more letters ('oneplus8t'
+# but not 'ox360' or 'izte'); alternatives are tried longest first
+_PRODUCT_BRAND_RE = re.compile("(" + "|".join(map(re.escape, _BRAND_KEYS)) + ")(?![a-z])")
+
+def _brand_from_product(product: Optional[str]) -> Optional[str]:
+    """Map a product name (e.g. 'OnePlus8T_EEA') to a brand if it starts with a known one.
+    
+    Anything less certain returns None, so the caller falls back to getprop.
+    """
+    if not product:
+        return None
+    match = _PRODUCT_BRAND_RE.match(product.lower())
+    return _BRAND_MAP[match.group(1)] if match else None
+
 class DeviceInfo(BaseModel):
     id: str
     type: str  # 'adb' or 'hdc'
@@ -25,9 +113,20 @@ class DeviceManager:
         self.hdc_connection = HDCConnection()
         self.adb_path = shutil.which("adb")
         self.hdc_path = shutil.which("hdc")
-        self.webrtc_devices = []  # List of manually added WebRTC devices
+        self._path_probe_ts = time.time() # Last time PATH was searched for missing tools
+        self.webrtc_devices: Dict[str, dict] = {}  # device_id -> manually added WebRTC device
+        self._token_to_id: Dict[str, str] = {} # session token -> WebRTC device_id
         self.pending_sessions = {} # token -> session_info
         self.device_permissions: Dict[str, Dict[str, bool]] = {} # device_id -> permissions
+        # Long-lived `adb shell` / `hdc shell` sessions, keyed by (device_type, device_id)
+        self._shell_procs: Dict[Tuple[str, str], subprocess.Popen] = {}
+        self._shell_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._shell_procs_lock = threading.Lock()
+        self._brand_cache: Dict[Tuple[str, str], str] = {} # (device_id, device_type) -> brand
+        # Thread pool for querying device brands concurrently
+        self._brand_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="device-brand")
+        self._local_ip_cache: Tuple[str, float] = ("", 0.0) # (ip, detected_at)
+        self._screen_dims: Dict[str, Tuple[int, int]] = {} # device_id -> (width, height), reused by replay resets
 
     def get_device_permissions(self, device_id: str) -> Dict[str, bool]:
         # Default permissions: All sensitive actions require approval (False)
@@ -48,196 +147,220 @@ class DeviceManager:
             cls._instance = cls()
         return cls._instance
 
-    def _get_device_brand(self, device_id: str, device_type: str) -> Optional[str]:
-        """Get device brand using ADB/HDC commands."""
-        try:
-            if device_type == "adb" and self.adb_path:
-                # Try ro.product.brand first, then ro.product.manufacturer
-                for prop in ["ro.product.brand", "ro.product.manufacturer"]:
-                    result = subprocess.run(
-                        [self.adb_path, "-s", device_id, "shell", "getprop", prop],
-                        capture_output=True,
-                        text=True,
-                        timeout=2
-                    )
-                    if result.returncode == 0 and result.stdout.strip():
-                        brand = result.stdout.strip()
-                        # Normalize brand names
-                        return self._normalize_brand(brand)
-            elif device_type == "hdc" and self.hdc_path:
-                # Try to get brand for HarmonyOS devices
-                for prop in ["hw_sc.build.platform.name", "ro.product.brand"]:
-                    result = subprocess.run(
-                        [self.hdc_path, "-t", device_id, "shell", "param get", prop],
-                        capture_output=True,
-                        text=True,
-                        timeout=2
-                    )
-                    if result.returncode == 0 and result.stdout.strip():
-                        brand = result.stdout.strip()
-                        return self._normalize_brand(brand)
-        except Exception as e:
-            print(f"Error getting device brand for {device_id}: {e}")
-        return None
-    
-    def _normalize_brand(self, brand: str) -> str:
-        """Normalize brand names to common formats."""
-        brand_lower = brand.lower().strip()
-        # Map common variations to standard names
-        brand_map = {
-            "huawei": "华为",
-            "honor": "荣耀",
-            "xiaomi": "小米",
-            "redmi": "红米",
-            "oppo": "OPPO",
-            "oneplus": "一加",
-            "vivo": "vivo",
-            "iqoo": "iQOO",
-            "samsung": "三星",
-            "meizu": "魅族",
-            "realme": "realme",
-            "motorola": "摩托罗拉",
-            "lenovo": "联想",
-            "zte": "中兴",
-            "coolpad": "酷派",
-            "gionee": "金立",
-            "nubia": "努比亚",
-            "smartisan": "锤子",
-            "360": "360",
-            "leeco": "乐视",
-        }
-        
-        # Check exact match first
-        if brand_lower in brand_map:
-            return brand_map[brand_lower]
+    def _shell_query(self, device_id: str, device_type: str, commands: List[str],
+                     timeout: float = 2) -> Optional[List[Optional[str]]]:
+        """
+        Run commands on a persistent device shell and return each one's output.
         
-        # Check partial match
-        for key, value in brand_map.items():
-            if key in brand_lower or brand_lower in key:
-                return value
+        The shell process is spawned on first use and reused afterwards, so
+        repeated queries skip the fork/exec and transport handshake. Each
+        command is followed by a marker line carrying its exit status; commands
+        that exit non-zero yield None. Returns None if the shell fails.
+        """
+        key = (device_type, device_id)
+        with self._shell_procs_lock:
+            lock = self._shell_locks.setdefault(key, threading.Lock())
         
-        # Return capitalized original if no match
-        return brand.strip().title()
+        with lock:
+            with self._shell_procs_lock:
+                proc = self._shell_procs.get(key)
+            if proc is None or proc.poll() is not None:
+                if device_type == "adb":
+                    cmd = [self.adb_path, "-s", device_id, "shell"]
+                else:
+                    cmd = [self.hdc_path, "-t", device_id, "shell"]
+                proc = subprocess.Popen(
+                    cmd,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                    bufsize=1
+                )
+                with self._shell_procs_lock:
+                    self._shell_procs[key] = proc
+            
+            # printf assembles the marker at runtime, so a shell that echoes its
+            # input never shows the marker line itself; the leading newline puts
+            # it on its own line even after output without a trailing newline
+            token = uuid.uuid4().hex
+            marker = re.compile(rf"__END_{token}_(\d+)")
+            command_line = "; ".join(
+                f"{command}; printf '\\n__END_%s_%s\\n' {token} \"$?\"" for command in commands
+            )
+            # Kill the shell if the device stops answering; readline then hits EOF
+            watchdog = threading.Timer(timeout, proc.kill)
+            watchdog.start()
+            try:
+                proc.stdin.write(command_line + "\n")
+                proc.stdin.flush()
+                results = []
+                lines = []
+                while len(results) < len(commands):
+                    line = proc.stdout.readline()
+                    if not line:
+                        # Shell exited or timed out
+                        self._drop_shell(key, proc)
+                        return None
+                    line = line.rstrip("\r\n")
+                    match = marker.fullmatch(line)
+                    if match is None:
+                        if line != command_line:  # Skip our own input if the shell echoes it
+                            lines.append(line)
+                        continue
+                    results.append("\n".join(lines) if match.group(1) == "0" else None)
+                    lines = []
+            except (OSError, ValueError):
+                self._drop_shell(key, proc)
+                proc.kill()
+                return None
+            finally:
+                watchdog.cancel()
+        return results
+
+    def _drop_shell(self, key: Tuple[str, str], proc: subprocess.Popen):
+        """Forget a dead shell session unless it was already replaced or closed."""
+        with self._shell_procs_lock:
+            if self._shell_procs.get(key) is proc:
+                del self._shell_procs[key]
+
+    def _forget_brand(self, device_id: str):
+        """Drop cached brand lookups for a device."""
+        for key in [k for k in self._brand_cache if k[0] == device_id]:
+            del self._brand_cache[key]
+
+    def cached_screen_dims(self, device_id: str) -> Optional[Tuple[int, int]]:
+        """Screen size last seen for a device, or None if unknown."""
+        return self._screen_dims.get(device_id)
+
+    def cache_screen_dims(self, device_id: str, dims: Tuple[int, int]):
+        """Remember a device's screen size until it detaches or is removed."""
+        self._screen_dims[device_id] = dims
+
+    def forget_screen_dims(self, device_id: str):
+        """Drop a device's cached screen size, e.g. after it rotated or was replaced."""
+        self._screen_dims.pop(device_id, None)
+
+    def _close_shell(self, device_id: str):
+        """Terminate persistent shell sessions opened for a device."""
+        with self._shell_procs_lock:
+            keys = [k for k in self._shell_procs if k[1] == device_id]
+            procs = [self._shell_procs.pop(k) for k in keys]
+        for proc in procs:
+            try:
+                proc.kill()
+                proc.wait(timeout=1)
+            except Exception:
+                pass
 
     def _get_device_brand(self, device_id: str, device_type: str) -> Optional[str]:
         """Get device brand using ADB/HDC commands."""
+        # Brand never changes for a device, so only query it once
+        key = (device_id, device_type)
+        if key in self._brand_cache:
+            return self._brand_cache[key]
+        
         try:
             if device_type == "adb" and self.adb_path:
-                # Try ro.product.brand first, then ro.product.manufacturer
-                for prop in ["ro.product.brand", "ro.product.manufacturer"]:
-                    result = subprocess.run(
-                        [self.adb_path, "-s", device_id, "shell", "getprop", prop],
-                        capture_output=True,
-                        text=True,
-                        timeout=2
-                    )
-                    if result.returncode == 0 and result.stdout.strip():
-                        brand = result.stdout.strip()
-                        # Normalize brand names
-                        return self._normalize_brand(brand)
+                # Query ro.product.brand and ro.product.manufacturer in one round-trip,
+                # preferring the brand
+                values = self._shell_query(
+                    device_id, "adb",
+                    ["getprop ro.product.brand", "getprop ro.product.manufacturer"]
+                )
             elif device_type == "hdc" and self.hdc_path:
                 # Try to get brand for HarmonyOS devices
-                for prop in ["hw_sc.build.platform.name", "ro.product.brand"]:
-                    result = subprocess.run(
-                        [self.hdc_path, "-t", device_id, "shell", "param get", prop],
-                        capture_output=True,
-                        text=True,
-                        timeout=2
-                    )
-                    if result.returncode == 0 and result.stdout.strip():
-                        brand = result.stdout.strip()
-                        return self._normalize_brand(brand)
+                values = self._shell_query(
+                    device_id, "hdc",
+                    ["param get hw_sc.build.platform.name", "param get ro.product.brand"]
+                )
+            else:
+                values = None
+            
+            if values:
+                for value in values:
+                    # Failed queries are None, so their error text never becomes a brand
+                    brand = value.strip() if value else ""
+                    if brand:
+                        # Normalize brand names
+                        normalized = self._normalize_brand(brand)
+                        self._brand_cache[key] = normalized
+                        return normalized
         except Exception as e:
-            print(f"Error getting device brand for {device_id}: {e}")
+            logger.warning("Error getting device brand for %s: %s", device_id, e)
         return None
     
     def _normalize_brand(self, brand: str) -> str:
         """Normalize brand names to common formats."""
-        brand_lower = brand.lower().strip()
-        # Map common variations to standard names
-        brand_map = {
-            "huawei": "华为",
-            "honor": "荣耀",
-            "xiaomi": "小米",
-            "redmi": "红米",
-            "oppo": "OPPO",
-            "oneplus": "一加",
-            "vivo": "vivo",
-            "iqoo": "iQOO",
-            "samsung": "三星",
-            "meizu": "魅族",
-            "realme": "realme",
-            "motorola": "摩托罗拉",
-            "lenovo": "联想",
-            "zte": "中兴",
-            "coolpad": "酷派",
-            "gionee": "金立",
-            "nubia": "努比亚",
-            "smartisan": "锤子",
-            "360": "360",
-            "leeco": "乐视",
-        }
-        
-        # Check exact match first
-        if brand_lower in brand_map:
-            return brand_map[brand_lower]
-        
-        # Check partial match
-        for key, value in brand_map.items():
-            if key in brand_lower or brand_lower in key:
-                return value
-        
-        # Return capitalized original if no match
-        return brand.strip().title()
+        return _normalize_brand_cached(brand)
 
     def list_all_devices(self) -> List[DeviceInfo]:
         devices = []
         
-        # Check if tools exist
-        if not self.adb_path:
-            # Try to re-detect in case it was added to PATH later
-            self.adb_path = shutil.which("adb")
+        # Check if tools exist; re-probing PATH is rate-limited since it stats every entry
+        if (not self.adb_path or not self.hdc_path) and time.time() - self._path_probe_ts > _PATH_PROBE_INTERVAL:
+            self._path_probe_ts = time.time()
             if not self.adb_path:
-                print("Warning: 'adb' executable not found in PATH.")
-        
-        if not self.hdc_path:
-            self.hdc_path = shutil.which("hdc")
+                # Try to re-detect in case it was added to PATH later
+                self.adb_path = shutil.which("adb")
+                if not self.adb_path:
+                    logger.warning("'adb' executable not found in PATH.")
+            
+            if not self.hdc_path:
+                self.hdc_path = shutil.which("hdc")
 
+        # Collect (device, type) pairs first so brands can be fetched concurrently
+        found = []
+        
         # List ADB Devices
         if self.adb_path:
             try:
-                adb_devices = adb_list_devices()
-                for d in adb_devices:
-                    brand = self._get_device_brand(d.device_id, "adb")
-                    print(f"Device {d.device_id} brand: {brand}")  # Debug log
-                    devices.append(DeviceInfo(
-                        id=d.device_id,
-                        type="adb",
-                        status="device", # Simplified for now
-                        connection_type=d.connection_type.value,
-                        brand=brand
-                    ))
+                found.extend((d, "adb") for d in adb_list_devices())
             except Exception as e:
-                print(f"Error listing ADB devices: {e}")
+                logger.error("Error listing ADB devices: %s", e)
 
         # List HDC Devices
         if self.hdc_path:
             try:
-                hdc_devices = hdc_list_devices()
-                for d in hdc_devices:
-                    brand = self._get_device_brand(d.device_id, "hdc")
-                    devices.append(DeviceInfo(
-                        id=d.device_id,
-                        type="hdc",
-                        status="device",
-                        connection_type=d.connection_type.value,
-                        brand=brand or "华为"  # HarmonyOS devices are typically Huawei
-                    ))
+                found.extend((d, "hdc") for d in hdc_list_devices())
             except Exception as e:
-                print(f"Error listing HDC devices: {e}")
+                logger.error("Error listing HDC devices: %s", e)
+        
+        # `adb devices -l` already reports the product name, which usually
+        # contains the brand; only query the device when it does not
+        def resolve_brand(item):
+            d, device_type = item
+            brand = _brand_from_product(getattr(d, "product", None))
+            return brand or self._get_device_brand(d.device_id, device_type)
+        
+        # Brand lookups are independent device round-trips; run them in parallel
+        brands = list(self._brand_executor.map(resolve_brand, found))
+        
+        for (d, device_type), brand in zip(found, brands):
+            if device_type == "adb":
+                logger.debug("Device %s brand: %s", d.device_id, brand)
+            else:
+                brand = brand or "华为"  # HarmonyOS devices are typically Huawei
+            devices.append(DeviceInfo(
+                id=d.device_id,
+                type=device_type,
+                status="device", # Simplified for now
+                connection_type=d.connection_type.value,
+                brand=brand
+            ))
+        
+        # Drop shell sessions and cached brands and screen sizes of devices that are no longer
+        # attached; a reconnect may be a different device or resolution behind the same id
+        attached = {d.id for d in devices}
+        for device_id in {k[1] for k in list(self._shell_procs)} - attached:
+            self._close_shell(device_id)
+        for device_id in {k[0] for k in list(self._brand_cache)} - attached:
+            self._forget_brand(device_id)
+        for device_id in set(self._screen_dims) - attached - set(self.webrtc_devices):
+            self.forget_screen_dims(device_id)
                 
         # List WebRTC Devices
-        for wd in self.webrtc_devices:
+        for wd in self.webrtc_devices.values():
             devices.append(DeviceInfo(
                 id=wd['id'],
                 type="webrtc",
@@ -248,11 +371,63 @@ class DeviceManager:
             
         return devices
 
-    def init_webrtc_session(self):
-        """Generate a new session for a device to connect to."""
-        token = str(uuid.uuid4())
+    def _interface_ips(self) -> List[str]:
+        """List IPv4 addresses of physical interfaces that are up, preferred LAN ranges first."""
+        if psutil is None:
+            return []
+        try:
+            stats = psutil.net_if_stats()
+            candidates = [
+                addr.address
+                for name, iface_addrs in psutil.net_if_addrs().items()
+                if name in stats and stats[name].isup and not _is_virtual_interface(name)
+                for addr in iface_addrs
+                if addr.family == socket.AF_INET
+                and not addr.address.startswith(("127.", "169.254.", "198.18."))
+            ]
+        except Exception:
+            return []
+        
+        def rank(ip: str) -> int:
+            if ip.startswith("192.168."):
+                return 0
+            if ip.startswith("10."):
+                return 1
+            parts = ip.split(".")
+            if parts[0] == "172" and 16 <= int(parts[1]) <= 31:
+                return 2
+            return 3
+        
+        return sorted(candidates, key=rank)
+
+    @staticmethod
+    def _default_route_ip() -> Optional[str]:
+        """Address of the interface on the default route, or None if there is none.
+        
+        Connecting a UDP socket only selects a route; no packet is sent.
+        """
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                s.connect(("8.8.8.8", 80))
+                ip = s.getsockname()[0]
+        except OSError:
+            return None
+        # 198.18.* is what proxy TUN interfaces put on the default route
+        if ip.startswith(("127.", "0.", "198.18.")):
+            return None
+        return ip
+
+    def _detect_local_ip(self) -> str:
+        """Detect the LAN IP address that mobile clients should connect to."""
+        # The default-route interface is the one the LAN sees; enumerating
+        # interfaces covers hosts without a default route, avoiding DNS
+        local_ip = self._default_route_ip()
+        if local_ip:
+            return local_ip
+        interface_ips = self._interface_ips()
+        if interface_ips:
+            return interface_ips[0]
         
-        # Detect local IP
         local_ip = "127.0.0.1"
         try:
             # Method 1: Try to get all interfaces and pick a 192.168.* one
@@ -285,8 +460,22 @@ class DeviceManager:
                          
         except Exception:
             # Hardcoded fallback if detection fails completely
-            local_ip = "192.168.31.232" 
-            
+            local_ip = "192.168.31.232"
+        return local_ip
+
+    def _get_local_ip(self) -> str:
+        """Return the local IP, re-detecting at most once per _LOCAL_IP_TTL seconds."""
+        local_ip, detected_at = self._local_ip_cache
+        if not local_ip or time.time() - detected_at > _LOCAL_IP_TTL:
+            local_ip = self._detect_local_ip()
+            self._local_ip_cache = (local_ip, time.time())
+        return local_ip
+
+    def init_webrtc_session(self):
+        """Generate a new session for a device to connect to."""
+        token = str(uuid.uuid4())
+        local_ip = self._get_local_ip()
+
         # Using 8000 as per new config.
         # Update: Generate HTTP URL for the mobile client page
         ws_url = f"https://{local_ip}:8000/api/devices/client/{token}"
@@ -300,31 +489,42 @@ class DeviceManager:
     def register_webrtc_connection(self, token: str, device_id: str, websocket):
         """Register a successful WebSocket connection from a device."""
         if token in self.pending_sessions:
-            self.webrtc_devices.append({
+            previous = self.webrtc_devices.get(device_id)
+            if previous and previous.get("token"):
+                self._token_to_id.pop(previous["token"], None)
+            self.webrtc_devices[device_id] = {
                 "id": device_id,
                 "type": "webrtc",
                 "token": token,
                 "socket": websocket,
                 "status": "connected" # Track status
-            })
+            }
+            self._token_to_id[token] = device_id
             del self.pending_sessions[token]
             return True
         return False
 
     def handle_webrtc_disconnect(self, token: str):
         """Mark device as offline on disconnect."""
-        for d in self.webrtc_devices:
-            if d.get("token") == token:
-                d["status"] = "offline"
-                d["socket"] = None
-                break
+        d = self.get_webrtc_device_by_token(token)
+        if d:
+            d["status"] = "offline"
+            d["socket"] = None
+            self._forget_brand(d["id"])
+            self.forget_screen_dims(d["id"])
 
     def update_webrtc_device(self, token: str, data: dict):
         """Update device info (e.g. latest screenshot)."""
-        for d in self.webrtc_devices:
-            if d.get("token") == token:
-                d.update(data)
-                break
+        d = self.get_webrtc_device_by_token(token)
+        if d:
+            d.update(data)
+
+    def get_webrtc_device_by_token(self, token: str) -> Optional[dict]:
+        """Look up a WebRTC device by its session token."""
+        device_id = self._token_to_id.get(token)
+        if device_id is None:
+            return None
+        return self.webrtc_devices.get(device_id)
 
     def add_webrtc_device(self, url: str) -> bool:
         # Simple registration for now. 
@@ -332,26 +532,29 @@ class DeviceManager:
         device_id = url.replace("ws://", "").replace("wss://", "").replace("/", "_")
         
         # Check if already exists
-        for d in self.webrtc_devices:
-            if d['id'] == device_id:
-                return True
+        if device_id in self.webrtc_devices:
+            return True
                 
-        self.webrtc_devices.append({
+        self.webrtc_devices[device_id] = {
             "id": device_id,
             "url": url
-        })
+        }
         return True
 
     def remove_device(self, device_id: str) -> bool:
         """Remove a device (only applicable for WebRTC/Offline devices)."""
-        original_count = len(self.webrtc_devices)
-        self.webrtc_devices = [d for d in self.webrtc_devices if d['id'] != device_id]
+        removed = self.webrtc_devices.pop(device_id, None)
+        if removed and removed.get("token"):
+            self._token_to_id.pop(removed["token"], None)
+        self._close_shell(device_id)
+        self._forget_brand(device_id)
+        self.forget_screen_dims(device_id)
         
         # If we removed the active device, clear selection
         if self.active_device_id == device_id:
             self.active_device_id = None
             
-        return len(self.webrtc_devices) < original_count
+        return removed is not None
 
     def set_active_device(self, device_id: str, device_type: str):
         self.active_device_id = device_id
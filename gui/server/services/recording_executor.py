@@ -1,12 +1,84 @@
 """Service for executing recorded actions."""
 
 import asyncio
+import logging
+import re
 import time
-from typing import Tuple, Optional
+from functools import lru_cache
+from typing import Any, Callable, Dict, Tuple, Optional
 from ..services.recording_manager import Recording, RecordedAction
 from ..services.device_manager import device_manager
 from phone_agent.device_factory import get_device_factory, set_device_type, DeviceType
 
+logger = logging.getLogger(__name__)
+
+# Action type -> handler(factory, params, device_id); "wait" is handled inline
+_ACTION_HANDLERS: Dict[str, Callable[[Any, Dict[str, Any], str], Any]] = {
+    "tap": lambda f, p, d: f.tap(p["x"], p["y"], device_id=d),
+    "swipe": lambda f, p, d: f.swipe(
+        p["x1"], p["y1"],
+        p["x2"], p["y2"],
+        duration_ms=p.get("duration", 500),
+        device_id=d
+    ),
+    "type": lambda f, p, d: f.type_text(p["text"], device_id=d),
+    "back": lambda f, p, d: f.back(device_id=d),
+    "home": lambda f, p, d: f.home(device_id=d),
+    "recent": lambda f, p, d: f.recent(device_id=d),
+}
+
+# Recording device_type -> factory DeviceType; anything else is treated as ADB
+_DEV_TYPE_MAP = {
+    "adb": DeviceType.ADB,
+    "hdc": DeviceType.HDC,
+    "ios": DeviceType.IOS,
+}
+
+# current_app values that mean the recording started on the home screen
+_HOME_EXACT = frozenset({"", "unknown", "system home", "home"})
+_HOME_RE = re.compile(r"home|launcher", re.I)
+
+def _ensure_device_type(device_type: str):
+    """Point the global device factory at device_type, skipping the reset when already current."""
+    dev_type = _DEV_TYPE_MAP.get(device_type, DeviceType.ADB)
+    # Compare against the live factory rather than a cached value, since other
+    # callers (agent runner, control router) switch the global factory too
+    if get_device_factory().device_type is not dev_type:
+        set_device_type(dev_type)
+
+# Minimum pause after an action before the next one starts
+_POST_ACTION_DELAY = 0.1
+
+async def _dispatch_action(
+    factory,
+    action_type: str,
+    params: Dict[str, Any],
+    device_id: str,
+    supports_recent: Optional[bool] = None
+) -> Tuple[bool, str]:
+    """
+    Execute one action through the handler table.
+    
+    supports_recent may be precomputed by callers executing many actions.
+    
+    Returns:
+        (handled, message) tuple; handled is False for unknown or unsupported actions
+    """
+    if action_type == "wait":
+        await asyncio.sleep(params.get("duration", 1.0))
+        return True, ""
+    
+    handler = _ACTION_HANDLERS.get(action_type)
+    if handler is None:
+        return False, f"Unknown action type: {action_type}"
+    if supports_recent is None:
+        supports_recent = hasattr(factory, "recent")
+    if action_type == "recent" and not supports_recent:
+        return False, "Recent apps not supported on this device type"
+    
+    handler(factory, params, device_id)
+    return True, ""
+
 async def execute_recording_actions(recording: Recording, device_id: str) -> Tuple[bool, str]:
     """
     Execute a recording's actions on a device.
@@ -20,62 +92,43 @@ async def execute_recording_actions(recording: Recording, device_id: str) -> Tup
     """
     try:
         # Set device type
-        if recording.device_type == "hdc":
-            set_device_type(DeviceType.HDC)
-        elif recording.device_type == "ios":
-            set_device_type(DeviceType.IOS)
-        else:
-            set_device_type(DeviceType.ADB)
+        _ensure_device_type(recording.device_type)
         
         factory = get_device_factory()
+        has_recent = hasattr(factory, "recent")
         
         # Execute actions in sequence
         last_timestamp = 0.0
+        settle_delay = 0.0  # Minimum gap still owed to the previous action
         for i, action in enumerate(recording.actions):
-            # Wait for the delay since last action
-            delay = action.timestamp - last_timestamp
-            if delay > 0:
-                await asyncio.sleep(delay)
-            
-            # Execute the action
             action_type = action.action_type
             params = action.params
             
-            try:
-                if action_type == "tap":
-                    factory.tap(params["x"], params["y"], device_id=device_id)
-                elif action_type == "swipe":
-                    factory.swipe(
-                        params["x1"], params["y1"],
-                        params["x2"], params["y2"],
-                        duration_ms=params.get("duration", 500),
-                        device_id=device_id
-                    )
-                elif action_type == "type":
-                    factory.type_text(params["text"], device_id=device_id)
-                elif action_type == "back":
-                    factory.back(device_id=device_id)
-                elif action_type == "home":
-                    factory.home(device_id=device_id)
-                elif action_type == "recent":
-                    if hasattr(factory, "recent"):
-                        factory.recent(device_id=device_id)
-                    else:
-                        print(f"Recent apps not supported on this device type")
+            # Wait for the delay since last action; the recorded gap already
+            # covers post-action settling, so only enforce the small delay
+            # when the recording is tighter than that
+            delay = max(action.timestamp - last_timestamp, settle_delay)
+            if action_type == "wait":
+                # Fold the wait into the same sleep
+                delay += params.get("duration", 1.0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            settle_delay = 0.0
+            
+            if action_type != "wait":
+                # Execute the action
+                try:
+                    handled, message = await _dispatch_action(factory, action_type, params, device_id, has_recent)
+                    if not handled:
+                        logger.warning(message)
                         continue
-                elif action_type == "wait":
-                    await asyncio.sleep(params.get("duration", 1.0))
-                else:
-                    print(f"Unknown action type: {action_type}")
-                    continue
-                
-                # Small delay after each action
-                await asyncio.sleep(0.1)
-                
-            except Exception as e:
-                print(f"Error executing action {i+1}/{len(recording.actions)}: {e}")
-                return False, f"Error executing action {i+1}: {str(e)}"
+                    
+                except Exception as e:
+                    logger.error("Error executing action %d/%d: %s", i + 1, len(recording.actions), e)
+                    return False, f"Error executing action {i+1}: {str(e)}"
             
+            # Small delay after each action
+            settle_delay = _POST_ACTION_DELAY
             last_timestamp = action.timestamp
         
         return True, f"Successfully executed {len(recording.actions)} actions"
@@ -83,94 +136,75 @@ async def execute_recording_actions(recording: Recording, device_id: str) -> Tup
     except Exception as e:
         return False, f"Execution failed: {str(e)}"
 
+@lru_cache(maxsize=128)
+def _is_home_screen(current_app: str) -> bool:
+    """Check whether a recorded current_app value denotes the home screen."""
+    return current_app.strip().lower() in _HOME_EXACT or bool(_HOME_RE.search(current_app))
+
+def _get_screen_dims(factory, device_id: str) -> Optional[Tuple[int, int]]:
+    """Get (width, height) of the device screen, taking a screenshot only on first use.
+    
+    The size is cached on device_manager, which drops it when the device detaches.
+    """
+    dims = device_manager.cached_screen_dims(device_id)
+    if dims is None:
+        screenshot = factory.get_screenshot(device_id=device_id, timeout=5)
+        if not screenshot:
+            return None
+        dims = (screenshot.width, screenshot.height)
+        device_manager.cache_screen_dims(device_id, dims)
+    return dims
+
 async def _reset_to_home_first_page(factory, device_id: str, device_type: str):
     """
     Reset device to home screen first page.
     This ensures we start recording from a consistent state.
     """
     try:
-        print(f"[Reset] Resetting to home first page (device_type: {device_type})")
+        logger.debug("[Reset] Resetting to home first page (device_type: %s)", device_type)
         
         # First, press home to go to home screen
-        print(f"[Reset] Pressing home button...")
+        logger.debug("[Reset] Pressing home button...")
         factory.home(device_id=device_id)
         await asyncio.sleep(0.8)  # Increased wait time
         
-        # For Android/HDC, try to swipe to the first page
-        # We'll swipe from right to left multiple times to ensure we're on the leftmost (first) page
-        if device_type in ["adb", "hdc"]:
+        # Home screens on Android/HDC and iOS all scroll horizontally, so swipe
+        # from right to left multiple times to ensure we're on the leftmost (first) page
+        if device_type in ("adb", "hdc", "ios"):
             try:
-                print(f"[Reset] Getting screen dimensions for swipe...")
+                logger.debug("[Reset] Getting screen dimensions for %s swipe...", device_type)
                 # Get screen dimensions for swipe
-                screenshot = factory.get_screenshot(device_id=device_id, timeout=5)
-                if screenshot:
-                    screen_width = screenshot.width
-                    screen_height = screenshot.height
-                    print(f"[Reset] Screen size: {screen_width}x{screen_height}")
+                dims = _get_screen_dims(factory, device_id)
+                if dims:
+                    screen_width, screen_height = dims
+                    logger.debug("[Reset] Screen size: %dx%d", screen_width, screen_height)
+                    # Swipe from 80% to 20% of screen width (right to left)
+                    x1, y1 = int(screen_width * 0.8), int(screen_height * 0.5)
+                    x2, y2 = int(screen_width * 0.2), int(screen_height * 0.5)
                     
-                    # Swipe from right to left multiple times to ensure we're on first page
-                    # This will move us to the leftmost page
-                    print(f"[Reset] Swiping to first page (3 times)...")
+                    logger.debug("[Reset] Swiping %s to first page (3 times)...", device_type)
                     for i in range(3):  # Swipe 3 times to ensure we reach the first page
-                        # Swipe from 80% to 20% of screen width (right to left)
-                        factory.swipe(
-                            int(screen_width * 0.8),
-                            int(screen_height * 0.5),
-                            int(screen_width * 0.2),
-                            int(screen_height * 0.5),
-                            duration_ms=400,
-                            device_id=device_id
-                        )
+                        factory.swipe(x1, y1, x2, y2, duration_ms=400, device_id=device_id)
                         await asyncio.sleep(0.4)
-                        print(f"[Reset] Swipe {i+1}/3 completed")
+                        logger.debug("[Reset] Swipe %d/3 completed", i + 1)
                 else:
-                    print(f"[Reset] Warning: Failed to get screenshot")
+                    logger.warning("[Reset] Failed to get screenshot")
             except Exception as e:
-                print(f"[Reset] Warning: Failed to reset to home first page via swipe: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.warning("[Reset] Failed to reset to home first page via swipe: %s", e, exc_info=True)
+                # The cached size may be stale (rotation, resolution change); re-fetch next time
+                device_manager.forget_screen_dims(device_id)
                 # Fallback: just press home again
                 factory.home(device_id=device_id)
                 await asyncio.sleep(0.5)
-        elif device_type == "ios":
-            # For iOS, swipe right to left to reach the first page
-            try:
-                print(f"[Reset] Getting screen dimensions for iOS swipe...")
-                screenshot = factory.get_screenshot(device_id=device_id, timeout=5)
-                if screenshot:
-                    screen_width = screenshot.width
-                    screen_height = screenshot.height
-                    print(f"[Reset] iOS screen size: {screen_width}x{screen_height}")
-                    # Swipe right to left (iOS home screens scroll horizontally)
-                    print(f"[Reset] Swiping iOS to first page (3 times)...")
-                    for i in range(3):
-                        factory.swipe(
-                            int(screen_width * 0.8),
-                            int(screen_height * 0.5),
-                            int(screen_width * 0.2),
-                            int(screen_height * 0.5),
-                            duration_ms=400,
-                            device_id=device_id
-                        )
-                        await asyncio.sleep(0.4)
-                        print(f"[Reset] iOS swipe {i+1}/3 completed")
-            except Exception as e:
-                print(f"[Reset] Warning: Failed to reset iOS home page: {e}")
-                import traceback
-                traceback.print_exc()
-                factory.home(device_id=device_id)
-                await asyncio.sleep(0.5)
         
         # Final home press to ensure we're on home screen
-        print(f"[Reset] Final home press...")
+        logger.debug("[Reset] Final home press...")
         factory.home(device_id=device_id)
         await asyncio.sleep(0.8)  # Increased wait time
-        print(f"[Reset] Reset to home first page completed successfully")
+        logger.debug("[Reset] Reset to home first page completed successfully")
         
     except Exception as e:
-        print(f"[Reset] Warning: Error resetting to home first page: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.warning("[Reset] Error resetting to home first page: %s", e, exc_info=True)
         # At least ensure we're on home screen
         try:
             factory.home(device_id=device_id)
@@ -190,15 +224,10 @@ async def reset_to_initial_state(recording: Recording, device_id: str) -> Tuple[
         (success, message) tuple
     """
     try:
-        print(f"[Reset] Starting reset to initial state for recording {recording.id}")
+        logger.debug("[Reset] Starting reset to initial state for recording %s", recording.id)
         
         # Set device type
-        if recording.device_type == "hdc":
-            set_device_type(DeviceType.HDC)
-        elif recording.device_type == "ios":
-            set_device_type(DeviceType.IOS)
-        else:
-            set_device_type(DeviceType.ADB)
+        _ensure_device_type(recording.device_type)
         
         factory = get_device_factory()
         
@@ -206,47 +235,38 @@ async def reset_to_initial_state(recording: Recording, device_id: str) -> Tuple[
         initial_state = recording.initial_state or {}
         current_app = initial_state.get("current_app", "")
         
-        print(f"[Reset] Initial state - current_app: {current_app}")
-        print(f"[Reset] Initial state - full: {initial_state}")
+        logger.debug("[Reset] Initial state - current_app: %s", current_app)
+        logger.debug("[Reset] Initial state - full: %s", initial_state)
         
         # Check if initial state was home screen
         # "System Home" is the standard return value for home screen
-        is_home_screen = (
-            not current_app or 
-            current_app == "Unknown" or 
-            current_app == "System Home" or
-            "Home" in current_app or 
-            "Launcher" in current_app or
-            current_app.lower() == "home"
-        )
+        is_home_screen = _is_home_screen(current_app or "")
         
-        print(f"[Reset] Is home screen: {is_home_screen}")
+        logger.debug("[Reset] Is home screen: %s", is_home_screen)
         
         # Always reset to home first page first to ensure consistent state
-        print(f"[Reset] Resetting to home first page...")
+        logger.debug("[Reset] Resetting to home first page...")
         await _reset_to_home_first_page(factory, device_id, recording.device_type)
-        print(f"[Reset] Reset to home first page completed")
+        logger.debug("[Reset] Reset to home first page completed")
         
         if is_home_screen:
             # If initial state was home screen, we're done
-            print(f"[Reset] Initial state was home screen, reset complete")
+            logger.debug("[Reset] Initial state was home screen, reset complete")
             return True, "Reset to initial state: returned to home first page"
         else:
             # Launch the app that was active when recording started
             try:
-                print(f"[Reset] Launching app: {current_app}")
+                logger.debug("[Reset] Launching app: %s", current_app)
                 success = factory.launch_app(current_app, device_id=device_id)
                 if success:
                     await asyncio.sleep(1.5)  # Wait for app to launch
-                    print(f"[Reset] App launched successfully: {current_app}")
+                    logger.debug("[Reset] App launched successfully: %s", current_app)
                     return True, f"Reset to initial state: returned to home first page, then launched {current_app}"
                 else:
-                    print(f"[Reset] Failed to launch app: {current_app}")
+                    logger.warning("[Reset] Failed to launch app: %s", current_app)
                     return False, f"Failed to launch app: {current_app}"
             except Exception as e:
-                print(f"[Reset] Error launching app {current_app}: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.error("[Reset] Error launching app %s: %s", current_app, e, exc_info=True)
                 return False, f"Error launching app {current_app}: {str(e)}"
         
     except Exception as e:
@@ -266,44 +286,18 @@ async def execute_single_action(action: RecordedAction, device_id: str, device_t
     """
     try:
         # Set device type
-        if device_type == "hdc":
-            set_device_type(DeviceType.HDC)
-        elif device_type == "ios":
-            set_device_type(DeviceType.IOS)
-        else:
-            set_device_type(DeviceType.ADB)
+        _ensure_device_type(device_type)
         
         factory = get_device_factory()
         action_type = action.action_type
         params = action.params
         
-        if action_type == "tap":
-            factory.tap(params["x"], params["y"], device_id=device_id)
-        elif action_type == "swipe":
-            factory.swipe(
-                params["x1"], params["y1"],
-                params["x2"], params["y2"],
-                duration_ms=params.get("duration", 500),
-                device_id=device_id
-            )
-        elif action_type == "type":
-            factory.type_text(params["text"], device_id=device_id)
-        elif action_type == "back":
-            factory.back(device_id=device_id)
-        elif action_type == "home":
-            factory.home(device_id=device_id)
-        elif action_type == "recent":
-            if hasattr(factory, "recent"):
-                factory.recent(device_id=device_id)
-            else:
-                return False, "Recent apps not supported on this device type"
-        elif action_type == "wait":
-            await asyncio.sleep(params.get("duration", 1.0))
-        else:
-            return False, f"Unknown action type: {action_type}"
+        handled, message = await _dispatch_action(factory, action_type, params, device_id)
+        if not handled:
+            return False, message
         
         # Small delay after action
-        await asyncio.sleep(0.1)
+        await asyncio.sleep(_POST_ACTION_DELAY)
         return True, f"Executed {action_type}"
         
     except Exception as e:
@@ -1,21 +1,59 @@
 """Recording manager for capturing and replaying device actions."""
 
+import bisect
 import json
+import logging
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, asdict
 from datetime import datetime
 import os
 import threading
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Fall back to stdlib json
+
+def _dumps(data: Any) -> bytes:
+    """Serialize data to indented UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+def _loads(raw: bytes) -> Any:
+    """Parse JSON bytes."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def _updated_at_key(recording: "RecordingSummary") -> str:
+    """Sort key for recordings; updated_at is an ISO timestamp so it orders lexically."""
+    return recording.updated_at
+
+def _search_blob(recording: "RecordingSummary") -> str:
+    """Lowercased name and keywords, newline-separated so a match can't span two fields."""
+    return "\n".join([recording.name, *recording.keywords]).lower()
+
+def _atomic_write_bytes(path: str, data: bytes):
+    """Write data to path via a temp file and os.replace so readers never see a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+@dataclass(slots=True)
 class RecordedAction:
     """A single recorded action."""
     action_type: str  # "tap", "swipe", "type", "back", "home", "recent", "wait"
     timestamp: float  # Time since recording started (seconds)
     params: Dict[str, Any]  # Action-specific parameters
     
-@dataclass
+@dataclass(slots=True)
 class Recording:
     """A complete recording with metadata."""
     id: str
@@ -29,6 +67,57 @@ class Recording:
     description: Optional[str] = None
     initial_state: Optional[Dict[str, Any]] = None  # Device state when recording started
 
+@dataclass(slots=True)
+class RecordingSummary:
+    """Recording metadata kept in index.json, without the action list."""
+    id: str
+    name: str
+    keywords: List[str]
+    device_id: str
+    device_type: str
+    action_count: int
+    created_at: str
+    updated_at: str
+    description: Optional[str] = None
+    initial_state: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_recording(cls, recording: Recording) -> "RecordingSummary":
+        return cls(
+            id=recording.id,
+            name=recording.name,
+            keywords=recording.keywords,
+            device_id=recording.device_id,
+            device_type=recording.device_type,
+            action_count=len(recording.actions),
+            created_at=recording.created_at,
+            updated_at=recording.updated_at,
+            description=recording.description,
+            initial_state=recording.initial_state
+        )
+
+# Free list of RecordedAction objects from discarded recordings, reused by record_action
+_ACTION_POOL: List[RecordedAction] = []
+_ACTION_POOL_MAX = 256
+
+def _new_action(action_type: str, timestamp: float, params: Dict[str, Any]) -> RecordedAction:
+    """Take a RecordedAction from the pool, or allocate one if the pool is empty."""
+    try:
+        action = _ACTION_POOL.pop()
+    except IndexError:
+        return RecordedAction(action_type=action_type, timestamp=timestamp, params=params)
+    action.action_type = action_type
+    action.timestamp = timestamp
+    action.params = params
+    return action
+
+def _release_actions(actions: List[RecordedAction]):
+    """Return actions that are no longer referenced to the pool."""
+    free = _ACTION_POOL_MAX - len(_ACTION_POOL)
+    for action in actions[:free]:
+        action.params = {}  # Drop the reference to the old params
+        _ACTION_POOL.append(action)
+
 class RecordingManager:
     """Manages action recordings for devices."""
     
@@ -48,57 +137,112 @@ class RecordingManager:
             return
         self._initialized = True
         
-        self._recordings: Dict[str, Recording] = {}
+        self._summaries: Dict[str, RecordingSummary] = {}  # All saved recordings, from index.json
+        self._recordings: "OrderedDict[str, Recording]" = OrderedDict()  # LRU of full recordings, loaded on first use
+        self._max_cached = 128  # Max full recordings kept in memory
         self._active_recordings: Dict[str, Dict[str, Any]] = {}  # device_id -> recording data
+        self._recording_id_to_device: Dict[str, str] = {}  # active recording_id -> device_id
+        self._recordings_sorted: List[RecordingSummary] = []  # Saved recordings by updated_at, oldest first
+        self._search_blobs: Dict[str, str] = {}  # recording_id -> _search_blob() for keyword filtering
         self._storage_path = os.path.join(os.path.dirname(__file__), "../../../data/recordings")
         os.makedirs(self._storage_path, exist_ok=True)
         
         self._load_recordings()
     
     def _load_recordings(self):
-        """Load all recordings from disk."""
+        """Load the recordings index from disk.
+        
+        Only metadata is read here; recording files are parsed on demand by
+        get_recording. Indexes written before metadata was stored are migrated
+        by reading each recording file once.
+        """
+        missing = []
+        index_file = os.path.join(self._storage_path, "index.json")
         try:
-            index_file = os.path.join(self._storage_path, "index.json")
             if os.path.exists(index_file):
-                with open(index_file, 'r', encoding='utf-8') as f:
-                    index = json.load(f)
+                with open(index_file, 'rb') as f:
+                    index = _loads(f.read())
+                metadata = index.get("metadata", {})
                     
                 for recording_id in index.get("recordings", []):
-                    recording_file = os.path.join(self._storage_path, f"{recording_id}.json")
-                    if os.path.exists(recording_file):
-                        try:
-                            with open(recording_file, 'r', encoding='utf-8') as f:
-                                data = json.load(f)
-                                recording = self._dict_to_recording(data)
-                                self._recordings[recording_id] = recording
-                        except Exception as e:
-                            print(f"Error loading recording {recording_id}: {e}")
+                    meta = metadata.get(recording_id)
+                    if meta is None:
+                        missing.append(recording_id)
+                        continue
+                    try:
+                        self._summaries[recording_id] = RecordingSummary(**meta)
+                    except Exception as e:
+                        # Stale or extra keys: rebuild this entry from its recording file
+                        logger.warning("Invalid index metadata for recording %s: %s", recording_id, e)
+                        missing.append(recording_id)
+        except Exception as e:
+            # Don't let an unreadable index wipe the library on the next save:
+            # rebuild it from the recording files instead
+            logger.error("Error loading recordings index, rebuilding from recording files: %s", e)
+            self._summaries.clear()
+            missing = [
+                name[:-len(".json")]
+                for name in os.listdir(self._storage_path)
+                if name.endswith(".json") and name != "index.json"
+            ]
+        
+        if missing:
+            # Parse files lacking metadata in parallel to overlap file I/O
+            with ThreadPoolExecutor(max_workers=8, thread_name_prefix="recording-load") as executor:
+                for recording in executor.map(self._read_recording, missing):
+                    if recording is not None:
+                        self._summaries[recording.id] = RecordingSummary.from_recording(recording)
+        migrated = bool(missing)
+        self._recordings_sorted = sorted(self._summaries.values(), key=_updated_at_key)
+        self._search_blobs = {
+            recording_id: _search_blob(summary)
+            for recording_id, summary in self._summaries.items()
+        }
+        if migrated:
+            self._save_recordings_index()
+    
+    def _read_recording(self, recording_id: str) -> Optional[Recording]:
+        """Read and parse a single recording file, or None if missing or invalid."""
+        recording_file = os.path.join(self._storage_path, f"{recording_id}.json")
+        if not os.path.exists(recording_file):
+            return None
+        try:
+            with open(recording_file, 'rb') as f:
+                return self._dict_to_recording(_loads(f.read()))
         except Exception as e:
-            print(f"Error loading recordings index: {e}")
+            logger.error("Error loading recording %s: %s", recording_id, e)
+            return None
     
     def _save_recordings_index(self):
-        """Save recordings index to disk."""
+        """Save recordings index, including each recording's metadata, to disk."""
         try:
             index_file = os.path.join(self._storage_path, "index.json")
             index = {
-                "recordings": list(self._recordings.keys()),
+                "recordings": list(self._summaries.keys()),
+                "metadata": {
+                    recording_id: asdict(summary)
+                    for recording_id, summary in self._summaries.items()
+                },
                 "updated_at": datetime.now().isoformat()
             }
-            with open(index_file, 'w', encoding='utf-8') as f:
-                json.dump(index, f, ensure_ascii=False, indent=2)
+            _atomic_write_bytes(index_file, _dumps(index))
         except Exception as e:
-            print(f"Error saving recordings index: {e}")
+            logger.error("Error saving recordings index: %s", e)
     
     def _save_recording(self, recording: Recording):
         """Save a single recording to disk."""
         try:
             recording_file = os.path.join(self._storage_path, f"{recording.id}.json")
-            data = self._recording_to_dict(recording)
-            with open(recording_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            if orjson is not None:
+                # orjson encodes dataclasses natively, skipping the per-action dict copies
+                payload = _dumps(recording)
+            else:
+                payload = _dumps(self._recording_to_dict(recording))
+            _atomic_write_bytes(recording_file, payload)
+            # The index carries metadata (name, updated_at, ...), so refresh it on every save
             self._save_recordings_index()
         except Exception as e:
-            print(f"Error saving recording {recording.id}: {e}")
+            logger.error("Error saving recording %s: %s", recording.id, e)
     
     def _recording_to_dict(self, recording: Recording) -> Dict[str, Any]:
         """Convert Recording to dictionary."""
@@ -108,7 +252,10 @@ class RecordingManager:
             "keywords": recording.keywords,
             "device_id": recording.device_id,
             "device_type": recording.device_type,
-            "actions": [asdict(action) for action in recording.actions],
+            "actions": [
+                {"action_type": action.action_type, "timestamp": action.timestamp, "params": action.params}
+                for action in recording.actions
+            ],
             "created_at": recording.created_at,
             "updated_at": recording.updated_at,
             "description": recording.description,
@@ -140,13 +287,19 @@ class RecordingManager:
             initial_state: Optional initial device state (current_app, screen_info, etc.)
         """
         recording_id = f"rec_{int(time.time() * 1000)}"
+        previous = self._active_recordings.get(device_id)
+        if previous is not None:
+            # Starting over discards the device's unsaved recording
+            self._recording_id_to_device.pop(previous["id"], None)
+            _release_actions(previous["actions"])
+        self._recording_id_to_device[recording_id] = device_id
         self._active_recordings[device_id] = {
             "id": recording_id,
             "device_id": device_id,
             "device_type": device_type,
-            "start_time": time.time(),
+            "start_time_ns": time.monotonic_ns(),  # Monotonic, immune to wall-clock jumps
             "actions": [],
-            "initial_state": initial_state or {}
+            "initial_state": dict(initial_state) if initial_state else {}
         }
         return recording_id
     
@@ -174,31 +327,21 @@ class RecordingManager:
             return
         
         recording_data = self._active_recordings[device_id]
-        elapsed = time.time() - recording_data["start_time"]
+        elapsed = (time.monotonic_ns() - recording_data["start_time_ns"]) / 1e9
         
-        action = RecordedAction(
-            action_type=action_type,
-            timestamp=elapsed,
-            params=params
-        )
-        recording_data["actions"].append(action)
+        # Snapshot params so later mutation by the caller can't alter the recording
+        recording_data["actions"].append(_new_action(action_type, elapsed, dict(params)))
     
     def save_recording(self, recording_id: str, name: str, keywords: List[str], 
                       description: Optional[str] = None) -> Optional[Recording]:
         """Save a recording with metadata."""
-        # Find the recording in active recordings
-        recording_data = None
-        for device_id, data in self._active_recordings.items():
-            if data["id"] == recording_id:
-                recording_data = data
-                break
-        
+        recording_data = self.get_active_recording_by_id(recording_id)
         if not recording_data:
             return None
         
         # Create Recording object
         now = datetime.now().isoformat()
-        actions = [RecordedAction(**asdict(action)) for action in recording_data["actions"]]
+        actions = list(recording_data["actions"])  # Already RecordedAction instances
         
         recording = Recording(
             id=recording_id,
@@ -214,47 +357,68 @@ class RecordingManager:
         )
         
         # Save to memory and disk
-        self._recordings[recording_id] = recording
+        summary = RecordingSummary.from_recording(recording)
+        previous = self._summaries.get(recording_id)
+        if previous is not None:
+            self._recordings_sorted.remove(previous)
+        self._summaries[recording_id] = summary
+        self._search_blobs[recording_id] = _search_blob(summary)
+        self._cache_recording(recording)
+        bisect.insort(self._recordings_sorted, summary, key=_updated_at_key)
         self._save_recording(recording)
         
         # Remove from active recordings
-        if recording_data["device_id"] in self._active_recordings:
-            del self._active_recordings[recording_data["device_id"]]
+        self._active_recordings.pop(recording_data["device_id"], None)
+        self._recording_id_to_device.pop(recording_id, None)
         
         return recording
     
     def get_recording(self, recording_id: str) -> Optional[Recording]:
-        """Get a recording by ID."""
-        return self._recordings.get(recording_id)
+        """Get a recording by ID, loading it from disk on first access."""
+        recording = self._recordings.get(recording_id)
+        if recording is not None:
+            self._recordings.move_to_end(recording_id)
+        elif recording_id in self._summaries:
+            recording = self._read_recording(recording_id)
+            if recording is not None:
+                self._cache_recording(recording)
+        return recording
+    
+    def _cache_recording(self, recording: Recording):
+        """Insert a recording into the LRU cache, evicting the least recently used."""
+        self._recordings[recording.id] = recording
+        self._recordings.move_to_end(recording.id)
+        while len(self._recordings) > self._max_cached:
+            self._recordings.popitem(last=False)
     
     def list_recordings(self, device_id: Optional[str] = None, 
-                       keyword: Optional[str] = None) -> List[Recording]:
-        """List all recordings, optionally filtered by device or keyword."""
-        recordings = list(self._recordings.values())
+                       keyword: Optional[str] = None) -> List[RecordingSummary]:
+        """List all recordings, optionally filtered by device or keyword.
+        
+        Returns index metadata only; use get_recording for the actions.
+        """
+        # Kept sorted on insert/delete; reverse for updated_at descending
+        recordings = self._recordings_sorted[::-1]
         
         if device_id:
             recordings = [r for r in recordings if r.device_id == device_id]
         
         if keyword:
             keyword_lower = keyword.lower()
-            filtered = []
-            for r in recordings:
-                if (keyword_lower in r.name.lower() or 
-                    any(keyword_lower in k.lower() for k in r.keywords)):
-                    filtered.append(r)
-            recordings = filtered
+            blobs = self._search_blobs
+            recordings = [r for r in recordings if keyword_lower in blobs[r.id]]
         
-        # Sort by updated_at descending
-        recordings.sort(key=lambda x: x.updated_at, reverse=True)
         return recordings
     
     def delete_recording(self, recording_id: str) -> bool:
         """Delete a recording."""
-        if recording_id not in self._recordings:
+        if recording_id not in self._summaries:
             return False
         
         # Remove from memory
-        del self._recordings[recording_id]
+        self._recordings_sorted.remove(self._summaries.pop(recording_id))
+        self._recordings.pop(recording_id, None)
+        self._search_blobs.pop(recording_id, None)
         
         # Remove from disk
         try:
@@ -263,13 +427,20 @@ class RecordingManager:
                 os.remove(recording_file)
             self._save_recordings_index()
         except Exception as e:
-            print(f"Error deleting recording file: {e}")
+            logger.error("Error deleting recording file: %s", e)
         
         return True
     
     def get_active_recording_data(self, device_id: str) -> Optional[Dict[str, Any]]:
         """Get active recording data for a device."""
         return self._active_recordings.get(device_id)
+    
+    def get_active_recording_by_id(self, recording_id: str) -> Optional[Dict[str, Any]]:
+        """Get active (unsaved) recording data by recording ID."""
+        device_id = self._recording_id_to_device.get(recording_id)
+        if device_id is None:
+            return None
+        return self._active_recordings.get(device_id)
 
 # Global instance
 recording_manager = RecordingManager()
@@ -1,21 +1,69 @@
 import threading
 import time
 import asyncio
-import traceback
-import hashlib
-from typing import Optional, Tuple, List, Callable
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, Callable, Set, Dict, Deque
 from .device_manager import device_manager
 from .stream_manager import stream_manager
-import asyncio
+from .video_streamer import video_streamer
 from phone_agent.device_factory import get_device_factory
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None  # Fall back to the builtin bytes hash
+
+def _frame_digest(data: bytes) -> int:
+    """Fast non-cryptographic hash of a whole frame.
+    
+    Change detection compares frame bytes directly, so this only runs when
+    latest_frame_hash is read; hashing every byte keeps equal digests
+    meaning equal frames.
+    """
+    if xxhash is not None:
+        return xxhash.xxh3_128_intdigest(data)
+    return hash(data)
+
+class _RollingStats:
+    """Fixed-size window of samples with an O(1) running mean."""
+    
+    def __init__(self, maxlen: int):
+        self._buf: Deque[float] = deque(maxlen=maxlen)
+        self._sum = 0.0
+    
+    def append(self, value: float):
+        if len(self._buf) == self._buf.maxlen:
+            self._sum -= self._buf[0]
+        self._buf.append(value)
+        self._sum += value
+    
+    def clear(self):
+        self._buf.clear()
+        self._sum = 0.0
+    
+    def mean(self) -> float:
+        return self._sum / len(self._buf) if self._buf else 0.0
+    
+    def __len__(self) -> int:
+        return len(self._buf)
+    
+    def __iter__(self):
+        return iter(self._buf)
+
 class ScreenStreamer:
     _instance = None
     
     def __init__(self):
         self.is_streaming = False
-        self.stream_thread: Optional[threading.Thread] = None
-        self.stop_event = threading.Event()
+        self._stream_task: Optional[asyncio.Task] = None
+        self._screen_state_task: Optional[asyncio.Task] = None
+        # Single worker so blocking ADB capture calls never overlap
+        self._capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screen-capture")
+        # Screen-state polls get their own worker so an ADB is_screen_on round trip
+        # never queues a capture behind it
+        self._state_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screen-state")
         self.fps = 60.0 # Increased to 60fps for smoother animations
         # Default settings for smooth streaming
         # Increased quality for better image clarity
@@ -24,31 +72,76 @@ class ScreenStreamer:
         
         # Screenshot method cache (remember fastest method)
         self._fastest_method = None  # 'scrcpy', 'raw', 'gzip', 'png', or None (auto-detect)
-        self._method_performance = {}  # Track method performance: {'raw': [durations...], 'gzip': [durations...], 'png': [durations...]}
+        self._method_performance: Dict[str, _RollingStats] = {}  # Track method performance: {'raw': durations, 'gzip': ..., 'png': ...}
         self._method_performance_samples = 5  # Number of samples to keep per method
         self._method_evaluation_interval = 30  # Re-evaluate method every 30 seconds
         self._last_method_evaluation = 0.0
+        # get_screenshot pre-bound to the current factory, method and settings;
+        # rebuilt only when one of those (the key) changes
+        self._capture_fn: Optional[Callable[[str], object]] = None
+        self._capture_fn_key: Optional[tuple] = None
         
-        self.latest_frame: Optional[bytes] = None
-        self.latest_frame_ts: float = 0.0
-        self.latest_frame_hash: Optional[str] = None  # MD5 hash for fast comparison
+        # (frame bytes, capture timestamp), replaced as a whole on each
+        # capture so readers get a consistent snapshot without locking
+        self._latest: Tuple[Optional[bytes], float] = (None, 0.0)
+        # Set (on its loop) when the next frame is published; created by waiting callers
+        self._first_frame_event: Optional[asyncio.Event] = None
+        self._first_frame_loop: Optional[asyncio.AbstractEventLoop] = None
         
         # Screen state cache (to reduce ADB calls)
         self._screen_on_cache: Optional[bool] = None
         self._screen_check_ts: float = 0.0
         self._screen_cache_ttl: float = 5.0  # Cache for 5 seconds (increased for better performance)
-        self._screen_cache_lock = threading.Lock()  # Lock for screen cache
-        self._frame_lock = threading.Lock()  # Lock for frame updates
+        self._screen_poll_interval: float = 1.0  # Background poll period while streaming
         
         # Screen change listeners for background tasks
-        self.screen_change_listeners: List[Callable[[], None]] = []
+        # Insertion-ordered set (dict keys): O(1) register/unregister, stable notify order
+        self.screen_change_listeners: Dict[Callable[[], None], None] = {}
         self._listeners_lock = threading.Lock()
+        # Reused worker threads for listener callbacks so frames don't spawn threads
+        self._notify_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="screen-change")
+        # Coalescing state per listener (guarded by _listeners_lock): at most one
+        # call in flight plus one re-fire queued, however fast frames change
+        self._listeners_in_flight: Set[Callable[[], None]] = set()
+        self._listeners_dirty: Set[Callable[[], None]] = set()
+        # Rate limit for notifications: leading edge fires immediately, changes inside
+        # the window are folded into one trailing notification
+        self._notify_min_interval = 0.25
+        self._last_notify_ts = 0.0
+        self._notify_scheduled = False  # Trailing notification pending on the event loop
         
         # Performance monitoring
-        self._capture_times: List[float] = []  # Recent capture durations
         self._max_capture_history = 30  # Keep last 30 captures
+        self._capture_times = _RollingStats(self._max_capture_history)  # Recent capture durations
         self._last_perf_log = 0.0
         self._perf_log_interval = 10.0  # Log performance every 10 seconds
+        
+        # Adaptive capture interval: grows while the screen is static, snaps back on change
+        self._current_interval = 1.0 / self.fps
+        self._max_idle_interval = 0.5  # Slowest polling while the screen is unchanged
+        self._idle_backoff = 1.5  # Interval multiplier per unchanged frame
+        self._locked_interval = 2.0  # Polling interval while the screen is off/locked
+        # While scrcpy video (which only encodes on change) is showing the screen and no
+        # client wants JPEG frames, polling only feeds snapshots and change listeners
+        self._video_poll_interval = 1.0
+
+    @property
+    def latest_frame(self) -> Optional[bytes]:
+        return self._latest[0]
+    
+    @property
+    def latest_frame_ts(self) -> float:
+        return self._latest[1]
+    
+    def latest_frame_snapshot(self) -> Tuple[Optional[bytes], float]:
+        """Latest (frame bytes, capture timestamp), read together so they always match."""
+        return self._latest
+
+    @property
+    def latest_frame_hash(self) -> int:
+        # Computed on demand: change detection compares bytes and never needs it
+        frame = self._latest[0]
+        return _frame_digest(frame) if frame is not None else 0
 
     @classmethod
     def get_instance(cls):
@@ -66,30 +159,36 @@ class ScreenStreamer:
         """
         # If background streaming is active, return cached frame immediately
         if self.is_streaming:
-            with self._frame_lock:
-                if self.latest_frame and self.latest_frame_ts > 0:
-                    # Check if frame is too old (older than 5 seconds)
-                    frame_age = time.time() - self.latest_frame_ts
-                    if frame_age < 5.0:
-                        # Always return 'new' when streaming to ensure frontend gets continuous updates
-                        # This prevents frontend from retrying too frequently
-                        return self.latest_frame, 'new'
-                    else:
-                        # Frame is too old, fallback to on-demand capture
-                        pass  # Fall through to on-demand capture
+            frame, frame_ts = self._latest
+            if frame and frame_ts > 0:
+                # Check if frame is too old (older than 5 seconds)
+                frame_age = time.time() - frame_ts
+                if frame_age < 5.0:
+                    # Always return 'new' when streaming to ensure frontend gets continuous updates
+                    # This prevents frontend from retrying too frequently
+                    return frame, 'new'
                 else:
-                    # No frame cached yet, but streaming is active
-                    # Wait a bit for background thread to capture first frame (max 500ms)
-                    # This avoids unnecessary on-demand capture when streaming just started
-                    for _ in range(5):
-                        await asyncio.sleep(0.1)
-                        with self._frame_lock:
-                            if self.latest_frame and self.latest_frame_ts > 0:
-                                frame_age = time.time() - self.latest_frame_ts
-                                if frame_age < 5.0:
-                                    return self.latest_frame, 'new'
-                    # Still no frame after waiting, fallback to on-demand capture
+                    # Frame is too old, fallback to on-demand capture
                     pass  # Fall through to on-demand capture
+            else:
+                # No frame cached yet, but streaming is active
+                # Wait a bit for background thread to capture first frame (max 500ms)
+                # This avoids unnecessary on-demand capture when streaming just started
+                if self._first_frame_event is None:
+                    self._first_frame_loop = asyncio.get_running_loop()
+                    self._first_frame_event = asyncio.Event()
+                event = self._first_frame_event
+                try:
+                    # Re-check after creating the event in case a frame landed in between
+                    if not self._latest[0]:
+                        await asyncio.wait_for(event.wait(), timeout=0.5)
+                    frame, frame_ts = self._latest
+                    if frame and time.time() - frame_ts < 5.0:
+                        return frame, 'new'
+                except asyncio.TimeoutError:
+                    pass
+                # Still no frame after waiting, fallback to on-demand capture
+                pass  # Fall through to on-demand capture
         
         # On-demand capture (fallback when streaming is not active or no cached frame)
         try:
@@ -105,131 +204,121 @@ class ScreenStreamer:
     
     def _capture_frame_sync(self, device_id: str) -> Tuple[Optional[bytes], str]:
         """
-        Synchronous frame capture (runs in thread).
+        Synchronous on-demand frame capture (runs in thread).
         Uses cached screen state to reduce ADB calls.
-        Returns capture duration for performance monitoring.
+        Returns: (frame_bytes, status)
         """
-        capture_start = time.time()
+        capture_start = time.monotonic()
         try:
-            factory = get_device_factory()
-            
-            # Check screen state with cache (reduces ADB calls)
-            is_on = self._get_screen_state_cached(device_id, factory)
-            if not is_on:
-                return None, 'locked'
-
-            # Run blocking ADB call with reasonable timeout
-            # Use 5 seconds timeout - balance between speed and reliability
-            # Too short timeout causes frequent failures and black screens
-            # Use preferred method if available for better performance
-            preferred_method = self._get_preferred_method()
-            if not hasattr(self, '_first_capture_logged'):
-                print(f"[ScreenStreamer] Starting capture with preferred_method={preferred_method}", flush=True)
-                self._first_capture_logged = True
-            method_start = time.time()
-            screenshot = factory.get_screenshot(
-                device_id, 
-                quality=self.quality, 
-                max_width=self.max_width,
-                timeout=5,  # 5 seconds - enough for slow devices but not too long
-                preferred_method=preferred_method
-            )
-            method_duration = time.time() - method_start
-            if not hasattr(self, '_first_screenshot_logged'):
-                if screenshot and screenshot.jpeg_data:
-                    print(f"[ScreenStreamer] First screenshot captured successfully: {len(screenshot.jpeg_data)} bytes, method={preferred_method}, duration={method_duration:.3f}s", flush=True)
-                else:
-                    print(f"[ScreenStreamer] First screenshot failed: screenshot={screenshot}, method={preferred_method}, duration={method_duration:.3f}s", flush=True)
-                self._first_screenshot_logged = True
-            
-            # Record method performance (only if we successfully got screenshot)
-            if screenshot and screenshot.jpeg_data:
-                # Determine which method was actually used
-                # Since we can't know for sure, we'll infer from preferred_method or track all attempts
-                # For now, we'll track based on preferred_method if it was used
-                if preferred_method:
-                    self._record_method_performance(preferred_method, method_duration)
-                # Re-evaluate fastest method periodically
-                self._evaluate_fastest_method()
-            
-            if screenshot and screenshot.jpeg_data:
-                # Use hash comparison for faster detection
-                frame_hash = hashlib.md5(screenshot.jpeg_data).hexdigest()
-                
-                # Check if frame changed before acquiring lock
-                frame_changed = False
-                with self._frame_lock:
-                    # Compare hash instead of full data
-                    if self.latest_frame_hash == frame_hash:
-                        # Frame content unchanged, but still update timestamp to ensure real-time updates
-                        # This ensures every captured frame is available, even if content is the same
-                        self.latest_frame_ts = time.time()
-                        capture_duration = time.time() - capture_start
-                        self._record_capture_time(capture_duration)
-                        # Return 'new' instead of 'unchanged' to ensure frame is pushed
-                        # This maintains real-time frame delivery even when content doesn't change
-                        return self.latest_frame, 'new'
-
-                    # Frame changed - update cache
-                    self.latest_frame = screenshot.jpeg_data
-                    self.latest_frame_hash = frame_hash
-                    self.latest_frame_ts = time.time()
-                    frame_changed = True
-                
-                # Notify listeners and broadcast via WebSocket outside of lock
-                if frame_changed:
-                    self._notify_screen_change()
-                
-                # Always broadcast via WebSocket if there are connections
-                # For frame changes, broadcast immediately for smooth animation
-                # For unchanged frames, also broadcast to maintain continuous stream
-                if stream_manager.frame_connections and self.latest_frame:
-                    try:
-                        # Use asyncio.run_coroutine_threadsafe to call async function from sync thread
-                        loop = stream_manager.main_loop
-                        if loop and loop.is_running():
-                            # Schedule the coroutine to run in the event loop immediately
-                            # This ensures frames are pushed as soon as they're captured
-                            asyncio.run_coroutine_threadsafe(
-                                stream_manager.broadcast_frame(
-                                    self.latest_frame, 
-                                    self.latest_frame_ts
-                                ),
-                                loop
-                            )
-                            # Don't wait for result to avoid blocking frame capture
-                            # Errors will be handled in broadcast_frame
-                    except Exception as e:
-                        # Don't let WebSocket errors break frame capture
-                        pass
-                
-                capture_duration = time.time() - capture_start
-                self._record_capture_time(capture_duration)
-                return self.latest_frame, 'new'
-                
-            return None, 'error'
+            screenshot, status = self._grab_screenshot(device_id)
+            if screenshot is None:
+                return None, status
+            # Hand off to the event loop without blocking frame capture
+            self._publish_frame(screenshot.jpeg_data, capture_start, stream_manager.publish_frame_threadsafe)
+            # Report 'new' even for unchanged content: HTTP callers (ETag, MJPEG)
+            # want the bytes either way, and WebSocket clients only get changes
+            return screenshot.jpeg_data, 'new'
         except Exception as e:
             # print(f"Capture error: {e}")
             return None, 'error'
     
+    def _grab_screenshot(self, device_id: str):
+        """
+        Blocking part of a capture: screen state check and screenshot.
+        Returns: (screenshot or None, status) where status is 'new', 'locked' or 'error'
+        """
+        factory = get_device_factory()
+        
+        # Check screen state with cache (reduces ADB calls)
+        is_on = self._get_screen_state_cached(device_id, factory)
+        if not is_on:
+            return None, 'locked'
+
+        # Run blocking ADB call with reasonable timeout
+        # Use 5 seconds timeout - balance between speed and reliability
+        # Too short timeout causes frequent failures and black screens
+        # Use preferred method if available for better performance
+        preferred_method = self._get_preferred_method()
+        if not hasattr(self, '_first_capture_logged'):
+            print(f"[ScreenStreamer] Starting capture with preferred_method={preferred_method}", flush=True)
+            self._first_capture_logged = True
+        capture_fn = self._get_capture_fn(factory, preferred_method)
+        method_start = time.monotonic()
+        screenshot = capture_fn(device_id)
+        method_duration = time.monotonic() - method_start
+        if not hasattr(self, '_first_screenshot_logged'):
+            if screenshot and screenshot.jpeg_data:
+                print(f"[ScreenStreamer] First screenshot captured successfully: {len(screenshot.jpeg_data)} bytes, method={preferred_method}, duration={method_duration:.3f}s", flush=True)
+            else:
+                print(f"[ScreenStreamer] First screenshot failed: screenshot={screenshot}, method={preferred_method}, duration={method_duration:.3f}s", flush=True)
+            self._first_screenshot_logged = True
+        
+        if not (screenshot and screenshot.jpeg_data):
+            return None, 'error'
+        
+        # Record method performance (only if we successfully got screenshot)
+        # Determine which method was actually used
+        # Since we can't know for sure, we'll infer from preferred_method or track all attempts
+        # For now, we'll track based on preferred_method if it was used
+        if preferred_method:
+            self._record_method_performance(preferred_method, method_duration)
+        # Re-evaluate fastest method periodically
+        self._evaluate_fastest_method()
+        return screenshot, 'new'
+    
+    def _publish_frame(self, jpeg_data: bytes, capture_start: float, send: Callable[[bytes, float], None]) -> bool:
+        """
+        Publish a captured frame, notify listeners on change and broadcast it via send.
+        Returns True if the frame content changed.
+        """
+        prev_frame = self._latest[0]
+        # A plain memcmp decides: the length check rejects most changed frames
+        # outright, and identical bytes (idle screen) skip hashing altogether
+        frame_changed = not (
+            prev_frame is not None and len(prev_frame) == len(jpeg_data) and prev_frame == jpeg_data
+        )
+        
+        now = time.time()  # Wall clock: sent to clients as the frame timestamp
+        
+        # Publish with a single reference store; readers never see a mixed tuple.
+        # Unchanged content still refreshes the timestamp to keep real-time frame delivery
+        self._latest = (jpeg_data, now)
+        
+        # Wake capture_frame callers waiting for the first frame
+        event = self._first_frame_event
+        if event is not None:
+            self._first_frame_event = None
+            self._first_frame_loop.call_soon_threadsafe(event.set)
+        
+        if frame_changed:
+            self._notify_screen_change()
+            
+            # Broadcast changed frames via WebSocket if there are connections
+            if stream_manager.frame_connections:
+                try:
+                    send(jpeg_data, now)
+                except Exception as e:
+                    # Don't let WebSocket errors break frame capture
+                    pass
+        
+        self._record_capture_time(time.monotonic() - capture_start)
+        return frame_changed
+    
     def _record_capture_time(self, duration: float):
         """Record capture duration for performance monitoring."""
-        self._capture_times.append(duration)
-        if len(self._capture_times) > self._max_capture_history:
-            self._capture_times.pop(0)
+        self._capture_times.append(duration)  # Window drops the oldest
     
     def _record_method_performance(self, method: str, duration: float):
         """Record performance of a screenshot method."""
-        if method not in self._method_performance:
-            self._method_performance[method] = []
-        self._method_performance[method].append(duration)
-        # Keep only recent samples
-        if len(self._method_performance[method]) > self._method_performance_samples:
-            self._method_performance[method].pop(0)
+        samples = self._method_performance.get(method)
+        if samples is None:
+            # Keep only recent samples; the window drops the oldest
+            samples = self._method_performance[method] = _RollingStats(self._method_performance_samples)
+        samples.append(duration)
     
     def _evaluate_fastest_method(self):
         """Evaluate and update the fastest screenshot method based on recent performance."""
-        now = time.time()
+        now = time.monotonic()
         # Only re-evaluate periodically to avoid overhead
         if now - self._last_method_evaluation < self._method_evaluation_interval:
             return
@@ -240,7 +329,7 @@ class ScreenStreamer:
         method_avg_times = {}
         for method, durations in self._method_performance.items():
             if durations:
-                method_avg_times[method] = sum(durations) / len(durations)
+                method_avg_times[method] = durations.mean()
         
         # Find fastest method
         if method_avg_times:
@@ -250,6 +339,20 @@ class ScreenStreamer:
                 # Optional: log method change for debugging
                 # print(f"[ScreenStreamer] Fastest method changed to: {fastest_method} (avg: {method_avg_times[fastest_method]:.3f}s)", flush=True)
     
+    def _get_capture_fn(self, factory, preferred_method: Optional[str]) -> Callable[[str], object]:
+        """Return factory.get_screenshot specialized for the current method and settings."""
+        key = (factory, preferred_method, self.quality, self.max_width)
+        if key != self._capture_fn_key:
+            self._capture_fn = functools.partial(
+                factory.get_screenshot,
+                quality=self.quality,
+                max_width=self.max_width,
+                timeout=5,  # 5 seconds - enough for slow devices but not too long
+                preferred_method=preferred_method
+            )
+            self._capture_fn_key = key
+        return self._capture_fn
+    
     def _get_preferred_method(self) -> Optional[str]:
         """Get the preferred screenshot method based on performance history.
         
@@ -258,18 +361,6 @@ class ScreenStreamer:
         """
         # scrcpy is disabled for screenshots - use ADB methods only
         # scrcpy is used for video streaming via VideoStreamer, not for screenshots
-        scrcpy_enabled = False
-        
-        if scrcpy_enabled:
-            # First, check if scrcpy is available (highest priority)
-            try:
-                from phone_agent.adb.scrcpy_capture import _check_scrcpy_available
-                if _check_scrcpy_available():
-                    return 'scrcpy'
-            except (ImportError, Exception):
-                # scrcpy not available or check failed, continue to other methods
-                pass
-        
         # Use the fastest ADB method from history (raw/gzip/png)
         return self._fastest_method
     
@@ -277,7 +368,7 @@ class ScreenStreamer:
         """Calculate actual FPS based on recent capture times."""
         if not self._capture_times:
             return 0.0
-        avg_duration = sum(self._capture_times) / len(self._capture_times)
+        avg_duration = self._capture_times.mean()
         if avg_duration <= 0:
             return 0.0
         return 1.0 / avg_duration
@@ -291,7 +382,7 @@ class ScreenStreamer:
         #     return
         # 
         # if self._capture_times:
-        #     avg_duration = sum(self._capture_times) / len(self._capture_times)
+        #     avg_duration = self._capture_times.mean()
         #     max_duration = max(self._capture_times)
         #     min_duration = min(self._capture_times)
         #     actual_fps = self._get_actual_fps()
@@ -312,38 +403,56 @@ class ScreenStreamer:
     def _get_screen_state_cached(self, device_id: str, factory) -> bool:
         """
         Get screen state with caching to reduce ADB calls.
-        Cache expires after _screen_cache_ttl seconds.
+        While streaming, the state is kept fresh by _screen_state_loop and this
+        never blocks; otherwise the cache expires after _screen_cache_ttl seconds.
         """
-        now = time.time()
+        if self._screen_state_task is not None:
+            cached = self._screen_on_cache
+            return cached if cached is not None else True
         
-        with self._screen_cache_lock:
-            # Check if cache is valid
-            if (self._screen_on_cache is not None and 
-                now - self._screen_check_ts < self._screen_cache_ttl):
-                return self._screen_on_cache
-            
-            # Cache expired or not set, check screen state
-            try:
-                self._screen_on_cache = factory.is_screen_on(device_id)
-                self._screen_check_ts = now
-                return self._screen_on_cache
-            except Exception:
-                # On error, assume screen is on (allow retries)
-                self._screen_on_cache = True
-                self._screen_check_ts = now
-                return True
-    
-    def _background_capture_loop(self):
+        now = time.monotonic()
+        # Check if cache is valid
+        if (self._screen_on_cache is not None and 
+            now - self._screen_check_ts < self._screen_cache_ttl):
+            return self._screen_on_cache
+        return self._refresh_screen_state(device_id, factory)
+    
+    def _refresh_screen_state(self, device_id: str, factory) -> bool:
+        """Query the device for its screen state and update the cache."""
+        try:
+            is_on = factory.is_screen_on(device_id)
+        except Exception:
+            # On error, assume screen is on (allow retries)
+            is_on = True
+        self._screen_on_cache = is_on
+        self._screen_check_ts = time.monotonic()
+        return is_on
+    
+    async def _screen_state_loop(self):
+        """Background task polling screen state so captures never wait on it."""
+        loop = asyncio.get_running_loop()
+        while True:
+            device_id = device_manager.active_device_id
+            if device_id:
+                await loop.run_in_executor(
+                    self._state_executor, self._refresh_screen_state, device_id, get_device_factory()
+                )
+            await asyncio.sleep(self._screen_poll_interval)
+    
+    async def _background_capture_loop(self):
         """
-        Background thread loop that continuously captures frames at configured FPS.
-        Uses dynamic frame interval based on actual capture time to maintain target FPS.
+        Background task that continuously captures frames at configured FPS.
+        Blocking ADB calls run on the capture executor; publishing and broadcast
+        happen inline on the event loop.
+        Uses dynamic frame interval based on actual capture time to maintain target FPS,
+        backing off while the screen content is unchanged or the screen is locked.
         """
-        target_frame_interval = 1.0 / self.fps if self.fps > 0 else 0.0167  # Default to ~60fps
+        loop = asyncio.get_running_loop()
         consecutive_errors = 0
         max_consecutive_errors = 20  # Increased to avoid stopping stream too easily
         
-        while not self.stop_event.is_set():
-            loop_start = time.time()
+        while self.is_streaming:
+            loop_start = time.monotonic()
             try:
                 device_id = device_manager.active_device_id
                 if not device_id:
@@ -353,14 +462,26 @@ class ScreenStreamer:
                         print("[ScreenStreamer] No device for too long, stopping stream", flush=True)
                         self.stop_streaming()
                         break
-                    time.sleep(0.5)
+                    await asyncio.sleep(0.5)
                     continue
                 
                 # Reset error counter on success
                 consecutive_errors = 0
                 
-                # Capture frame synchronously
-                frame, status = self._capture_frame_sync(device_id)
+                # Re-read FPS each iteration so update_settings takes effect
+                target_frame_interval = 1.0 / self.fps if self.fps > 0 else 0.0167  # Default to ~60fps
+                if video_streamer.active_streams and not stream_manager.frame_connections:
+                    target_frame_interval = max(target_frame_interval, self._video_poll_interval)
+                
+                # Capture frame on the executor, publish inline
+                screenshot, status = await loop.run_in_executor(
+                    self._capture_executor, self._grab_screenshot, device_id
+                )
+                frame = screenshot.jpeg_data if screenshot else None
+                if frame is not None:
+                    if not self._publish_frame(frame, loop_start, stream_manager.queue_frame):
+                        # Captured fine but content is identical to the previous frame
+                        status = 'unchanged'
                 
                 # Log first few captures for debugging
                 if not hasattr(self, '_capture_count'):
@@ -373,67 +494,49 @@ class ScreenStreamer:
                 self._log_performance()
                 
                 # Calculate actual capture time
-                capture_duration = time.time() - loop_start
+                capture_duration = time.monotonic() - loop_start
                 
+                # Screen off/locked: nothing to show, poll slowly until it wakes
+                if status == 'locked':
+                    self._current_interval = target_frame_interval
+                    await asyncio.sleep(self._locked_interval)
                 # If capture failed, use exponential backoff
-                if status == 'error' or status == 'locked':
+                elif status == 'error':
                     # Exponential backoff: 0.1s, 0.2s, 0.4s, 0.8s, max 1s
                     backoff = min(0.1 * (2 ** min(consecutive_errors, 3)), 1.0)
                     consecutive_errors += 1
                     # Don't wait too long on error - keep trying
-                    time.sleep(backoff)
+                    await asyncio.sleep(backoff)
                 elif status == 'unchanged':
-                    # Frame unchanged is normal, not an error
-                    # But we should still update timestamp to ensure real-time frame delivery
-                    # This ensures every captured frame is available, even if content is the same
+                    # Frame unchanged is normal, not an error; _publish_frame
+                    # has already refreshed latest_frame_ts
                     consecutive_errors = 0
-                    # Update timestamp even for unchanged frames to maintain real-time updates
-                    with self._frame_lock:
-                        if self.latest_frame:
-                            self.latest_frame_ts = time.time()
-                    # Still broadcast cached frame via WebSocket to maintain continuous stream
-                    # This matches HTTP polling behavior where we always get the latest frame
-                    if stream_manager.frame_connections and self.latest_frame:
-                        try:
-                            loop = stream_manager.main_loop
-                            if loop and loop.is_running():
-                                asyncio.run_coroutine_threadsafe(
-                                    stream_manager.broadcast_frame(
-                                        self.latest_frame, 
-                                        self.latest_frame_ts
-                                    ),
-                                    loop
-                                )
-                        except Exception:
-                            pass
-                    # Still wait for target interval to maintain consistent FPS
-                    remaining_time = target_frame_interval - capture_duration
-                    if remaining_time > 0:
-                        # Use precise sleep for smooth frame rate (cap at target interval)
-                        time.sleep(min(remaining_time, target_frame_interval))
-                    else:
-                        time.sleep(0.001)  # Minimal wait if capture took too long
+                    # Static screen: poll progressively slower, up to _max_idle_interval
+                    self._current_interval = min(
+                        max(self._current_interval, target_frame_interval) * self._idle_backoff,
+                        max(self._max_idle_interval, target_frame_interval)
+                    )
+                    remaining_time = self._current_interval - capture_duration
+                    await asyncio.sleep(max(remaining_time, 0.001))  # Minimal wait if capture took too long
                 else:
+                    # Screen changed: return to full FPS
+                    self._current_interval = target_frame_interval
                     # Dynamic frame interval: adjust based on actual capture time
                     # If capture took longer than target interval, use minimal wait
-                    # Otherwise, wait for remaining time to maintain target FPS
+                    # to avoid spinning; otherwise wait for remaining time to maintain target FPS
                     remaining_time = target_frame_interval - capture_duration
-                    if remaining_time > 0:
-                        # Use precise sleep for smooth frame rate (cap at target interval)
-                        time.sleep(min(remaining_time, target_frame_interval))
-                    else:
-                        # Capture took too long, minimal wait to avoid CPU spinning
-                        # But don't wait too long to maintain responsiveness
-                        time.sleep(0.001)
+                    await asyncio.sleep(max(remaining_time, 0.001))
                     
                     consecutive_errors = 0
                     
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 consecutive_errors += 1
                 print(f"[ScreenStreamer] Background capture error: {e}", flush=True)
                 # Exponential backoff on exception
                 backoff = min(0.1 * (2 ** min(consecutive_errors, 4)), 2.0)
-                time.sleep(backoff)
+                await asyncio.sleep(backoff)
                 
                 # Stop streaming after too many consecutive errors
                 if consecutive_errors >= max_consecutive_errors:
@@ -443,7 +546,8 @@ class ScreenStreamer:
     
     def start_streaming(self):
         """
-        Start background streaming thread to continuously capture frames.
+        Start background streaming tasks to continuously capture frames.
+        Must be called from the event loop (all callers are async route handlers).
         """
         if self.is_streaming:
             return  # Already streaming
@@ -453,8 +557,11 @@ class ScreenStreamer:
             print("[ScreenStreamer] Cannot start streaming: no device selected", flush=True)
             return  # No device selected
         
+        loop = asyncio.get_running_loop()
+        if stream_manager.main_loop is None:
+            stream_manager.main_loop = loop
+        
         self.is_streaming = True
-        self.stop_event.clear()
         
         # Reset performance metrics
         self._capture_times.clear()
@@ -464,31 +571,38 @@ class ScreenStreamer:
         # This prevents black screen during stream restart
         # The frame will be updated naturally as new frames are captured
         
-        # Start background thread
-        self.stream_thread = threading.Thread(
-            target=self._background_capture_loop,
-            daemon=True,
-            name="screen-streamer"
-        )
-        self.stream_thread.start()
+        # Start background tasks
+        self._stream_task = loop.create_task(self._background_capture_loop(), name="screen-streamer")
+        self._screen_state_task = loop.create_task(self._screen_state_loop(), name="screen-state-poller")
         print(f"[ScreenStreamer] Started background streaming at {self.fps} FPS for device {device_id}", flush=True)
     
     def stop_streaming(self):
         """
-        Stop background streaming thread.
+        Stop background streaming tasks.
         """
         if not self.is_streaming:
             return  # Not streaming
         
         self.is_streaming = False
-        self.stop_event.set()
         
-        # Wait for thread to finish (with timeout)
-        if self.stream_thread and self.stream_thread.is_alive():
-            self.stream_thread.join(timeout=1.0)
+        # The capture task may call this itself when giving up; it then exits
+        # its loop on its own, so only cancel other tasks
+        current = asyncio.current_task() if self._in_event_loop() else None
+        for task in (self._stream_task, self._screen_state_task):
+            if task is not None and task is not current:
+                task.cancel()
         
-        self.stream_thread = None
+        self._stream_task = None
+        self._screen_state_task = None
         print("[ScreenStreamer] Stopped background streaming", flush=True)
+    
+    @staticmethod
+    def _in_event_loop() -> bool:
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
 
     def update_settings(self, quality: int = None, max_width: int = None, fps: int = None):
         """
@@ -506,30 +620,100 @@ class ScreenStreamer:
     def register_screen_change_listener(self, callback: Callable[[], None]):
         """Register a callback to be called when screen changes."""
         with self._listeners_lock:
-            if callback not in self.screen_change_listeners:
-                self.screen_change_listeners.append(callback)
+            self.screen_change_listeners.setdefault(callback, None)
     
     def unregister_screen_change_listener(self, callback: Callable[[], None]):
         """Unregister a screen change listener."""
         with self._listeners_lock:
-            if callback in self.screen_change_listeners:
-                self.screen_change_listeners.remove(callback)
+            self.screen_change_listeners.pop(callback, None)
+            self._listeners_dirty.discard(callback)
     
     def _notify_screen_change(self):
-        """Notify all registered listeners about screen change.
-        This is called from the async capture_frame context, so we use threading
-        to ensure listeners are called in separate threads and don't block capture.
+        """Notify listeners about a screen change, at most once per _notify_min_interval.
+        
+        Changes arriving inside the interval schedule a single trailing
+        notification so the final screen state is always reported.
         """
+        now = time.monotonic()
         with self._listeners_lock:
-            listeners = list(self.screen_change_listeners)  # Copy to avoid lock contention
+            if self._notify_scheduled:
+                return  # Trailing notification already scheduled
+            wait = self._last_notify_ts + self._notify_min_interval - now
+            if wait > 0 and self._schedule_trailing_notify(wait):
+                self._notify_scheduled = True
+                return
+            self._last_notify_ts = now
+        self._dispatch_screen_change()
+    
+    def _schedule_trailing_notify(self, wait: float) -> bool:
+        """Schedule _notify_deferred on the event loop after wait seconds.
         
-        # Call listeners in separate threads to avoid blocking screen capture
-        for callback in listeners:
-            try:
-                # Use threading to call callback asynchronously
-                threading.Thread(target=callback, daemon=True, name="screen-change-notify").start()
-            except Exception as e:
-                # Don't let one listener's error break others
-                print(f"[ScreenStreamer] Error in screen change listener: {e}", flush=True)
+        The capture loop runs on the event loop; on-demand captures run on a
+        worker thread and hand the timer over to the main loop. Returns False
+        if no loop is available to schedule on.
+        """
+        try:
+            asyncio.get_running_loop().call_later(wait, self._notify_deferred)
+            return True
+        except RuntimeError:
+            pass
+        loop = stream_manager.main_loop
+        if loop is None or not loop.is_running():
+            return False
+        loop.call_soon_threadsafe(loop.call_later, wait, self._notify_deferred)
+        return True
+    
+    def _notify_deferred(self):
+        """Event-loop callback delivering the trailing notification."""
+        with self._listeners_lock:
+            self._notify_scheduled = False
+            self._last_notify_ts = time.monotonic()
+        self._dispatch_screen_change()
+    
+    def _dispatch_screen_change(self):
+        """Submit all registered listeners to the notify thread pool.
+        This is called from the capture path, so listeners run on the notify
+        thread pool and don't block capture. A listener still in flight is
+        marked dirty instead of being queued again.
+        """
+        with self._listeners_lock:
+            to_submit = []
+            for callback in self.screen_change_listeners:
+                if callback in self._listeners_in_flight:
+                    # Already running; re-fire once when it finishes
+                    self._listeners_dirty.add(callback)
+                else:
+                    self._listeners_in_flight.add(callback)
+                    to_submit.append(callback)
+        
+        # Call listeners on pooled threads to avoid blocking screen capture
+        for callback in to_submit:
+            self._submit_listener(callback)
+    
+    def _submit_listener(self, callback: Callable[[], None]):
+        """Schedule a listener call on the notify pool."""
+        try:
+            self._notify_executor.submit(self._run_listener, callback)
+        except Exception as e:
+            with self._listeners_lock:
+                self._listeners_in_flight.discard(callback)
+                self._listeners_dirty.discard(callback)
+            print(f"[ScreenStreamer] Error scheduling screen change listener: {e}", flush=True)
+    
+    def _run_listener(self, callback: Callable[[], None]):
+        """Run a listener, then re-run it once if the screen changed meanwhile."""
+        try:
+            callback()
+        except Exception as e:
+            # Don't let one listener's error break others
+            print(f"[ScreenStreamer] Error in screen change listener: {e}", flush=True)
+        
+        with self._listeners_lock:
+            rerun = callback in self._listeners_dirty and callback in self.screen_change_listeners
+            self._listeners_dirty.discard(callback)
+            if not rerun:
+                self._listeners_in_flight.discard(callback)
+        if rerun:
+            self._submit_listener(callback)
 
 screen_streamer = ScreenStreamer.get_instance()
@@ -1,15 +1,88 @@
 import asyncio
-import base64
-import gzip
-from typing import List
+import json
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Set, Tuple
 from fastapi import WebSocket
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Fall back to stdlib json
+
+# Binary frame message header: magic, timestamp in ms, flags; JPEG bytes follow
+_FRAME_HEADER = struct.Struct("<BQB")
+_FRAME_MAGIC = 0x01
+_FRAME_FLAG_COMPRESSED = 0x01
+
+# wbits=31 emits a gzip container, which the browser's DecompressionStream('gzip') reads
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+def _gzip_fast(data: bytes) -> bytes:
+    """Gzip data at level 1 with a single deflate pass."""
+    compressor = zlib.compressobj(1, zlib.DEFLATED, _GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+_JPEG_MAGIC = b"\xff\xd8\xff"
+_H264_START_CODES = (b"\x00\x00\x00\x01", b"\x00\x00\x01")
+
+def is_precompressed(data: bytes) -> bool:
+    """True for JPEG or H.264 Annex-B payloads, which are already entropy-coded
+    and don't shrink meaningfully under gzip."""
+    return data.startswith(_JPEG_MAGIC) or data.startswith(_H264_START_CODES)
+
+def _encode_frame(frame_bytes: bytes, timestamp: float) -> bytes:
+    """Build the binary frame message: fixed header followed by the raw (or gzipped) JPEG."""
+    flags = 0
+    payload = frame_bytes
+    if is_precompressed(frame_bytes):
+        # Skip the deflate pass entirely; it would almost never clear the 10% bar
+        return _FRAME_HEADER.pack(_FRAME_MAGIC, int(timestamp * 1000), flags) + payload
+    # Compress frame data with gzip to reduce transmission size
+    try:
+        # Level 1: most of the size win of level 6 at a fraction of the CPU
+        compressed_frame = _gzip_fast(frame_bytes)
+        # Only use compression if it actually reduces size (at least 10% reduction)
+        if len(compressed_frame) < len(frame_bytes) * 0.9:
+            payload = compressed_frame
+            flags |= _FRAME_FLAG_COMPRESSED
+    except Exception:
+        # If compression fails, use original uncompressed data
+        pass
+    # Sent as a binary message, so frames are neither base64-encoded nor wrapped in JSON
+    return _FRAME_HEADER.pack(_FRAME_MAGIC, int(timestamp * 1000), flags) + payload
+
+def _encode_json(message: dict) -> str:
+    """Encode a message as compact JSON text, matching WebSocket.send_json output."""
+    if orjson is not None:
+        # OPT_NON_STR_KEYS: accept int keys like json.dumps does
+        return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
 class StreamManager:
     _instance = None
     
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.frame_connections: List[WebSocket] = []  # Separate list for frame streaming
+        self.active_connections: Set[WebSocket] = set()
+        self.frame_connections: Set[WebSocket] = set()  # Separate set for frame streaming
+        # Per frame connection: one-slot send queue (newest frame wins) and its writer task,
+        # so one slow client can't stall frame delivery to the others
+        self._frame_queues: Dict[WebSocket, asyncio.Queue] = {}
+        self._frame_writers: Dict[WebSocket, asyncio.Task] = {}
+        # Latest frame handed over from the capture thread, flushed on the event loop
+        self._pending_frame: Optional[Tuple[bytes, float]] = None
+        self._flush_scheduled = False
+        self._pending_lock = threading.Lock()
+        # Frames are only pushed on change; the keepalive re-sends the last
+        # encoded frame when nothing has been broadcast for a while
+        self._last_frame_message: Optional[bytes] = None
+        self._last_frame_sent = 0.0  # time.monotonic() of the last frame broadcast
+        self._keepalive_interval = 1.0
+        self._keepalive_task: Optional[asyncio.Task] = None
+        # A broadcast waits at most this long on any one client before dropping it
+        self._send_timeout = 5.0
         self.main_loop = None
 
     @classmethod
@@ -25,21 +98,39 @@ class StreamManager:
             except RuntimeError:
                 pass
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        if websocket in self.frame_connections:
-            self.frame_connections.remove(websocket)
+        self.active_connections.discard(websocket)
+        self.disconnect_frame_stream(websocket)
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                # Handle disconnected clients gracefully
-                pass
+        if not self.active_connections:
+            return
+        # Encode once and send to all clients concurrently; the timeout keeps a
+        # stalled client from holding up delivery (and the broadcast) for everyone
+        data = _encode_json(message)
+        connections = list(self.active_connections)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(connection.send_text(data), self._send_timeout) for connection in connections),
+            return_exceptions=True
+        )
+        # Drop clients whose send failed (disconnected) or timed out
+        dropped = {
+            connection for connection, result in zip(connections, results)
+            if isinstance(result, Exception)
+        }
+        if dropped:
+            self.active_connections -= dropped
+            # Close them too, so a stalled peer's socket isn't left open behind our back
+            await asyncio.gather(*(self._close_quietly(connection) for connection in dropped))
+
+    async def _close_quietly(self, websocket: WebSocket):
+        """Close a dropped WebSocket, ignoring peers that are already gone."""
+        try:
+            await asyncio.wait_for(websocket.close(), self._send_timeout)
+        except Exception:
+            pass
 
     async def connect_frame_stream(self, websocket: WebSocket):
         """Connect a WebSocket for frame streaming."""
@@ -49,52 +140,104 @@ class StreamManager:
             except RuntimeError:
                 pass
         await websocket.accept()
-        self.frame_connections.append(websocket)
+        queue = asyncio.Queue(maxsize=1)  # Latest value only: a newer frame replaces one not yet sent
+        self._frame_queues[websocket] = queue
+        self._frame_writers[websocket] = asyncio.create_task(self._frame_writer(websocket, queue))
+        self.frame_connections.add(websocket)
+        if self._last_frame_message is not None:
+            # Give the new client the current screen without waiting for a change
+            queue.put_nowait(self._last_frame_message)
+        if self._keepalive_task is None or self._keepalive_task.done():
+            self._keepalive_task = asyncio.create_task(self._frame_keepalive())
 
     def disconnect_frame_stream(self, websocket: WebSocket):
         """Disconnect a frame streaming WebSocket."""
-        if websocket in self.frame_connections:
-            self.frame_connections.remove(websocket)
+        self.frame_connections.discard(websocket)
+        self._frame_queues.pop(websocket, None)
+        writer = self._frame_writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
 
-    async def broadcast_frame(self, frame_bytes: bytes, timestamp: float):
-        """Broadcast frame data to all connected frame stream clients."""
-        if not self.frame_connections:
-            return
-        
-        # Compress frame data with gzip to reduce transmission size
+    async def _frame_writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Send queued frame messages to one client until it disconnects."""
         try:
-            compressed_frame = gzip.compress(frame_bytes, compresslevel=6)  # Level 6 is a good balance
-            # Only use compression if it actually reduces size (at least 10% reduction)
-            if len(compressed_frame) < len(frame_bytes) * 0.9:
-                frame_b64 = base64.b64encode(compressed_frame).decode('utf-8')
-                compressed = True
-            else:
-                # Compression didn't help, use original
-                frame_b64 = base64.b64encode(frame_bytes).decode('utf-8')
-                compressed = False
+            while True:
+                # The one-slot queue always holds the newest unsent frame
+                data = await queue.get()
+                # A peer that stops reading is dropped instead of holding its writer forever
+                await asyncio.wait_for(websocket.send_bytes(data), self._send_timeout)
+        except asyncio.CancelledError:
+            pass
         except Exception:
-            # If compression fails, use original uncompressed data
-            frame_b64 = base64.b64encode(frame_bytes).decode('utf-8')
-            compressed = False
-        
-        message = {
-            "type": "frame",
-            "data": frame_b64,
-            "compressed": compressed,  # Flag to indicate if data is compressed
-            "timestamp": int(timestamp * 1000)  # Convert to milliseconds
-        }
+            # Send failed or timed out - client is gone
+            self.disconnect_frame_stream(websocket)
+            await self._close_quietly(websocket)
+
+    async def _frame_keepalive(self):
+        """Re-send the latest frame at a low rate while the screen is idle."""
+        try:
+            while self.frame_connections:
+                await asyncio.sleep(self._keepalive_interval)
+                message = self._last_frame_message
+                if message is None:
+                    continue
+                if time.monotonic() - self._last_frame_sent >= self._keepalive_interval:
+                    self._enqueue_frame_message(message)
+        except asyncio.CancelledError:
+            pass
+
+    def publish_frame_threadsafe(self, frame_bytes: bytes, timestamp: float):
+        """Queue a frame for broadcast from a non-event-loop thread.
         
-        # Send to all frame connections
-        disconnected = []
-        for connection in self.frame_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                # Mark for removal
-                disconnected.append(connection)
+        Only the newest frame is kept; the loop is woken with a single
+        call_soon_threadsafe per flush instead of a coroutine and Future per frame.
+        """
+        loop = self.main_loop
+        if loop is None or not loop.is_running():
+            return
+        with self._pending_lock:
+            self._pending_frame = (frame_bytes, timestamp)
+            if self._flush_scheduled:
+                return  # The pending flush will pick up this newer frame
+            self._flush_scheduled = True
+        loop.call_soon_threadsafe(self._flush_pending_frame)
+
+    def _flush_pending_frame(self):
+        """Event-loop callback broadcasting the latest published frame."""
+        with self._pending_lock:
+            pending = self._pending_frame
+            self._pending_frame = None
+            self._flush_scheduled = False
+        if pending is not None:
+            self.queue_frame(*pending)
+
+    async def broadcast_frame(self, frame_bytes: bytes, timestamp: float):
+        """Broadcast frame data to all connected frame stream clients."""
+        self.queue_frame(frame_bytes, timestamp)
+
+    def queue_frame(self, frame_bytes: bytes, timestamp: float):
+        """Encode a frame once and hand it to every frame connection's queue.
         
-        # Remove disconnected clients
-        for conn in disconnected:
-            self.disconnect_frame_stream(conn)
+        Must be called on the event loop.
+        """
+        if not self.frame_connections:
+            return
+        # Frames are JPEG, so encoding only prepends the 10-byte header: cheap enough for the loop
+        data = _encode_frame(frame_bytes, timestamp)
+        self._last_frame_message = data
+        self._enqueue_frame_message(data)
+
+    def _enqueue_frame_message(self, data: bytes):
+        """Put an encoded frame message on every frame connection's queue."""
+        self._last_frame_sent = time.monotonic()
+        # Hand the frame to each connection's writer without waiting on the socket;
+        # a client still sending has its unsent frame replaced by this one
+        for queue in list(self._frame_queues.values()):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(data)
 
 stream_manager = StreamManager.get_instance()
@@ -1,15 +1,69 @@
+import base64
+import itertools
+import os
+import shutil
+import threading
 import uuid
 import time
-from typing import Dict, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+from urllib.parse import quote
 from pydantic import BaseModel
 
-class TaskLog(BaseModel):
+try:
+    import pybase64
+except ImportError:
+    pybase64 = None  # Fall back to stdlib base64
+
+_b64decode = pybase64.b64decode if pybase64 is not None else base64.b64decode
+
+# Per-task log cap; the oldest entries (and their screenshots) are dropped first
+MAX_TASK_LOGS = 500
+
+# Screenshot file names are unique per process, whichever TaskManager stores them
+_screen_seq = itertools.count(1)
+
+def _write_screenshot(path: str, screenshot_b64: str):
+    """Decode a base64 JPEG and write it to path."""
+    with open(path, 'wb') as f:
+        f.write(_b64decode(screenshot_b64))
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+@dataclass(slots=True)
+class TaskLog:
+    """A single task log entry (plain dataclass: built on every add_log)."""
+    timestamp: float
+    level: str
+    message: str
+    screenshot: Optional[str] = None  # URL of the screenshot served by the tasks router
+
+@dataclass(slots=True)
+class AgentTask:
+    """In-memory task state; converted to AgentTaskModel only when returned by the API."""
+    id: str
+    device_id: str
+    type: str  # 'chat' or 'background'
+    name: str
+    created_at: float
+    role: Optional[str] = None
+    details: Optional[str] = None # The goal/instruction
+    status: str = "idle" # idle, running, stopped, completed, error
+    logs: Deque[TaskLog] = field(default_factory=lambda: deque(maxlen=MAX_TASK_LOGS))
+
+class TaskLogModel(BaseModel):
     timestamp: float
     level: str
     message: str
     screenshot: Optional[str] = None
 
-class AgentTask(BaseModel):
+class AgentTaskModel(BaseModel):
     id: str
     device_id: str
     type: str  # 'chat' or 'background'
@@ -18,13 +72,25 @@ class AgentTask(BaseModel):
     details: Optional[str] = None # The goal/instruction
     status: str = "idle" # idle, running, stopped, completed, error
     created_at: float
-    logs: List[TaskLog] = []
+    logs: List[TaskLogModel] = []
 
 class TaskManager:
     _instance = None
     
     def __init__(self):
         self.tasks: Dict[str, AgentTask] = {}
+        self._by_device: Dict[str, List[AgentTask]] = {}  # device_id -> tasks, oldest first
+        # Guards tasks/_by_device and log appends: add_log runs on agent threads
+        # while the routers mutate tasks from the event loop
+        self._lock = threading.Lock()
+        # Log screenshots are kept on disk as <seq>.jpg and referenced by URL,
+        # rather than as base64 strings in memory and in every list_tasks response
+        self._screens_path = os.path.join(os.path.dirname(__file__), "../../../data/task_screens")
+        os.makedirs(self._screens_path, exist_ok=True)
+        # seq -> owning task id (guarded by _lock), so a task only serves its own screenshots
+        self._screen_owners: Dict[int, str] = {}
+        # Removals run on a single thread, keeping delete_task's file I/O off the event loop
+        self._screen_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-screens")
 
     @classmethod
     def get_instance(cls):
@@ -43,42 +109,98 @@ class TaskManager:
             details=details,
             created_at=time.time()
         )
-        self.tasks[task_id] = task
+        with self._lock:
+            previous = self.tasks.get(task_id)
+            if previous is not None:
+                # Re-created with an explicit id: the new task replaces the old one
+                self._by_device[previous.device_id].remove(previous)
+            self.tasks[task_id] = task
+            self._by_device.setdefault(device_id, []).append(task)
         return task
 
     def get_task(self, task_id: str) -> Optional[AgentTask]:
         return self.tasks.get(task_id)
 
     def list_tasks(self, device_id: str) -> List[AgentTask]:
-        # Sort by creation time desc
-        tasks = [t for t in self.tasks.values() if t.device_id == device_id]
-        tasks.sort(key=lambda x: x.created_at, reverse=True)
-        return tasks
+        # Newest first; tasks are appended in creation order, so no sort is needed
+        with self._lock:
+            return self._by_device.get(device_id, [])[::-1]
 
     def delete_task(self, task_id: str):
-        if task_id in self.tasks:
-            del self.tasks[task_id]
+        with self._lock:
+            task = self.tasks.pop(task_id, None)
+            if task is None:
+                return
+            self._by_device[task.device_id].remove(task)
+            for log in task.logs:
+                self._discard_screenshot(log)
 
     def add_log(self, task_id: str, level: str, message: str, screenshot: str = None):
-        if task_id in self.tasks:
-            self.tasks[task_id].logs.append(TaskLog(
-                timestamp=time.time(),
-                level=level,
-                message=message,
-                screenshot=screenshot
-            ))
+        """Append a log entry; screenshot is base64 JPEG and is stored on disk."""
+        task = self.tasks.get(task_id)
+        if task is None:
+            return
+        seq = self._store_screenshot(screenshot) if screenshot else None
+        # Explicit task ids may contain '/', '?' or '#', so escape them to route back here
+        screenshot_url = f"/api/tasks/{quote(task_id, safe='')}/screens/{seq}.jpg" if seq is not None else None
+        with self._lock:
+            if seq is not None:
+                self._screen_owners[seq] = task_id
+            logs = task.logs
+            if len(logs) == logs.maxlen:
+                # The deque is about to drop its oldest entry
+                self._discard_screenshot(logs[0])
+            logs.append(TaskLog(time.time(), level, message, screenshot_url))
+
+    def clear_stale_screenshots(self):
+        """Remove screenshots left by a previous run; called once at app startup."""
+        # Tasks live in memory only, so screenshots left by a previous run are orphans
+        shutil.rmtree(self._screens_path, ignore_errors=True)
+        os.makedirs(self._screens_path, exist_ok=True)
+
+    def get_screenshot_path(self, task_id: str, seq: int) -> Optional[str]:
+        """Path of a stored log screenshot, or None unless it belongs to one of the task's logs."""
+        with self._lock:
+            if self._screen_owners.get(seq) != task_id:
+                return None
+        return self._screenshot_file(seq)
+
+    def _screenshot_file(self, seq: int) -> str:
+        return os.path.join(self._screens_path, f"{seq}.jpg")
+
+    def _store_screenshot(self, screenshot_b64: str) -> Optional[int]:
+        """Write a screenshot and return its seq, or None if it couldn't be written.
+        
+        add_log runs on agent threads, so the write happens inline: the file
+        exists before its URL is handed out.
+        """
+        seq = next(_screen_seq)
+        try:
+            _write_screenshot(self._screenshot_file(seq), screenshot_b64)
+        except (OSError, ValueError):
+            return None
+        return seq
+
+    def _discard_screenshot(self, log: TaskLog):
+        if log.screenshot:
+            seq = int(log.screenshot.rsplit("/", 1)[1].split(".", 1)[0])
+            self._screen_owners.pop(seq, None)
+            self._screen_writer.submit(_remove_file, self._screenshot_file(seq))
 
     def update_status(self, task_id: str, status: str):
-        if task_id in self.tasks:
-            self.tasks[task_id].status = status
+        task = self.tasks.get(task_id)
+        if task is not None:
+            task.status = status
 
     def update_task(self, task_id: str, name: str = None, details: str = None):
-        if task_id in self.tasks:
+        task = self.tasks.get(task_id)
+        if task is None:
+            return None
+        with self._lock:
             if name is not None:
-                self.tasks[task_id].name = name
+                task.name = name
             if details is not None:
-                self.tasks[task_id].details = details
-            return self.tasks[task_id]
-        return None
+                task.details = details
+        return task
 
 task_manager = TaskManager.get_instance()
@@ -6,13 +6,401 @@ Uses HTTP chunked transfer encoding for streaming.
 """
 
 import asyncio
+import logging
 import subprocess
 import time
 import os
+import shutil
 import tempfile
-from typing import Optional, AsyncGenerator
+from collections import deque
+from typing import Deque, Dict, List, Optional, AsyncGenerator, Set, Tuple
 from .device_manager import device_manager
 
+logger = logging.getLogger(__name__)
+
+try:
+    import av
+except ImportError:
+    av = None  # Fall back to remuxing with an ffmpeg subprocess
+
+# Fragmented MP4 for MSE playback. frag_every_frame emits a moof/mdat per frame:
+# cutting only at keyframes held each frame back for a whole GOP before the
+# browser could see it, so -frag_duration tuning isn't needed either
+_FMP4_MOVFLAGS = "frag_keyframe+frag_every_frame+empty_moov+default_base_moof"
+
+
+# scrcpy logs this once the recorder has opened its output file (the FIFO)
+_RECORDING_STARTED = "Recording started"
+
+
+class _StderrPump:
+    """
+    Drains a subprocess's stderr for its whole lifetime so the pipe never fills.
+    
+    Lines are echoed as they arrive and the most recent ones are kept for error
+    reports. `ready` is set once ready_marker is logged or stderr ends; `matched`
+    tells which of the two happened.
+    """
+
+    def __init__(
+        self,
+        process: asyncio.subprocess.Process,
+        tag: str,
+        ready_marker: Optional[str] = None,
+        max_lines: int = 50
+    ):
+        self.process = process
+        self.tag = tag
+        self.lines: Deque[str] = deque(maxlen=max_lines)
+        self.ready = asyncio.Event()
+        self.matched = False
+        self._ready_marker = ready_marker
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            while True:
+                try:
+                    line = await self.process.stderr.readline()
+                except ValueError:
+                    # Over-long line; readline has already discarded it
+                    continue
+                if not line:
+                    return
+                text = line.decode(errors="replace").strip()
+                if not text:
+                    continue
+                self.lines.append(text)
+                logger.debug("[VideoStreamer] %s: %s", self.tag, text)
+                if self._ready_marker and not self.matched and self._ready_marker in text:
+                    self.matched = True
+                    self.ready.set()
+        finally:
+            self.ready.set()
+
+    async def tail(self, timeout: float = 0.5) -> str:
+        """Recent stderr lines, first letting the pump reach EOF if the process has exited."""
+        if self.process.returncode is not None and not self._task.done():
+            await asyncio.wait({self._task}, timeout=timeout)
+        return "\n".join(self.lines)
+
+    def cancel(self):
+        self._task.cancel()
+
+
+class _FMp4Writer:
+    """
+    Write-only file handing muxer output from the mux thread to an asyncio queue.
+    
+    Deliberately has no seek/tell so PyAV treats the output as a non-seekable stream.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self._loop = loop
+        self._queue = queue
+
+    def write(self, b) -> int:
+        data = bytes(b)
+        if data:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, data)
+        return len(data)
+
+    def end(self):
+        """Queue the empty chunk that marks end of stream."""
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, b"")
+
+
+def _mux_fmp4(source_path: str, writer: _FMp4Writer):
+    """
+    Remux scrcpy's MKV recording into fragmented MP4 in-process with PyAV.
+    
+    Blocking; runs on a worker thread and ends when scrcpy closes the FIFO.
+    An empty chunk is queued at the end to signal EOF to the reader.
+    """
+    try:
+        # Opening the FIFO blocks until scrcpy opens it for writing
+        with av.open(source_path, format="matroska") as src:
+            in_stream = src.streams.video[0]
+            with av.open(writer, mode="w", format="mp4",
+                         options={"movflags": _FMP4_MOVFLAGS, "flush_packets": "1"}) as dst:
+                # PyAV 14 renamed add_stream(template=...) to add_stream_from_template()
+                if hasattr(dst, "add_stream_from_template"):
+                    out_stream = dst.add_stream_from_template(in_stream)
+                else:
+                    out_stream = dst.add_stream(template=in_stream)
+                for packet in src.demux(in_stream):
+                    # The demuxer yields a final empty packet to flush; skip it
+                    if packet.dts is None:
+                        continue
+                    packet.stream = out_stream
+                    dst.mux(packet)
+    except Exception as e:
+        logger.warning("[VideoStreamer] PyAV remux stopped: %s", e)
+    finally:
+        writer.end()
+
+
+# Larger top-level "boxes" mean the bytes aren't MP4 after all
+_MAX_BOX_SIZE = 64 * 1024 * 1024
+
+# Kinds of unit _Mp4Splitter emits
+_UNIT_INIT = "init"  # ftyp/moov: needed before any fragment can be decoded
+_UNIT_KEY = "key"  # moof+mdat starting with a sync sample
+_UNIT_DELTA = "delta"  # any other moof+mdat
+_UNIT_OTHER = "other"  # remaining boxes, or raw bytes once the stream isn't parseable
+
+
+def _child_box(buf: bytes, start: int, end: int, box_type: bytes) -> Optional[Tuple[int, int]]:
+    """(payload start, end) of the first box_type child within buf[start:end], if any."""
+    while start + 8 <= end:
+        size = int.from_bytes(buf[start:start + 4], "big")
+        if size < 8:
+            return None
+        if buf[start + 4:start + 8] == box_type:
+            return start + 8, min(start + size, end)
+        start += size
+    return None
+
+
+def _is_keyframe_fragment(moof: bytes) -> bool:
+    """Whether a moof's first sample is a sync sample, from its tfhd/trun sample flags."""
+    traf = _child_box(moof, 8, len(moof), b"traf")
+    if traf is None:
+        return False
+    sample_flags = None
+    tfhd = _child_box(moof, traf[0], traf[1], b"tfhd")
+    if tfhd:
+        pos = tfhd[0]
+        flags = int.from_bytes(moof[pos + 1:pos + 4], "big")
+        pos += 8  # version/flags, track_ID
+        pos += 8 if flags & 0x01 else 0  # base_data_offset
+        pos += 4 if flags & 0x02 else 0  # sample_description_index
+        pos += 4 if flags & 0x08 else 0  # default_sample_duration
+        pos += 4 if flags & 0x10 else 0  # default_sample_size
+        if flags & 0x20:
+            sample_flags = int.from_bytes(moof[pos:pos + 4], "big")
+    trun = _child_box(moof, traf[0], traf[1], b"trun")
+    if trun:
+        pos = trun[0]
+        flags = int.from_bytes(moof[pos + 1:pos + 4], "big")
+        pos += 8  # version/flags, sample_count
+        pos += 4 if flags & 0x01 else 0  # data_offset
+        if flags & 0x04:
+            sample_flags = int.from_bytes(moof[pos:pos + 4], "big")
+        elif flags & 0x400:
+            pos += 4 if flags & 0x100 else 0  # sample_duration
+            pos += 4 if flags & 0x200 else 0  # sample_size
+            sample_flags = int.from_bytes(moof[pos:pos + 4], "big")
+    # sample_is_non_sync_sample is bit 16
+    return sample_flags is not None and not sample_flags & 0x10000
+
+
+class _Mp4Splitter:
+    """Splits a fragmented MP4 byte stream into whole top-level units."""
+
+    def __init__(self):
+        self._pending = b""  # incomplete box carried over to the next feed
+        self._moof: Optional[bytes] = None  # moof waiting for its mdat
+        self._passthrough = False
+
+    def feed(self, data: bytes) -> List[Tuple[bytes, str]]:
+        """Return the (data, kind) units completed by data."""
+        if self._passthrough:
+            return [(data, _UNIT_OTHER)]
+        units: List[Tuple[bytes, str]] = []
+        # Parse the chunk in place; only an incomplete trailing box is carried over
+        buf = self._pending + data if self._pending else data
+        end = len(buf)
+        pos = 0
+        with memoryview(buf) as view:
+            while end - pos >= 8:
+                size = int.from_bytes(view[pos:pos + 4], "big")
+                box_type = bytes(view[pos + 4:pos + 8])
+                if size == 1:
+                    if end - pos < 16:
+                        break
+                    size = int.from_bytes(view[pos + 8:pos + 16], "big")
+                if size < 8 or size > _MAX_BOX_SIZE:
+                    # Box runs to end of stream (size 0) or this isn't MP4: stop splitting
+                    self._passthrough = True
+                    units.append(((self._moof or b"") + view[pos:], _UNIT_OTHER))
+                    self._moof = None
+                    self._pending = b""
+                    return units
+                if end - pos < size:
+                    break
+                box = view[pos:pos + size]
+                pos += size
+                if box_type == b"moof":
+                    self._moof = bytes(box)
+                elif box_type == b"mdat" and self._moof:
+                    kind = _UNIT_KEY if _is_keyframe_fragment(self._moof) else _UNIT_DELTA
+                    # bytes + memoryview copies the mdat payload exactly once
+                    units.append((self._moof + box, kind))
+                    self._moof = None
+                elif box_type in (b"ftyp", b"moov"):
+                    units.append((bytes(box), _UNIT_INIT))
+                else:
+                    units.append((bytes(box), _UNIT_OTHER))
+            self._pending = bytes(view[pos:]) if pos < end else b""
+        return units
+
+
+class _FragmentBuffer:
+    """
+    Bounded per-client buffer of MP4 units.
+    
+    When a slow client lets more than max_bytes queue up, whole GOPs are
+    dropped instead of latency creeping up behind them: everything before the
+    newest queued keyframe goes, or, if even that GOP doesn't fit, all queued
+    fragments go and the client skips ahead to the next keyframe. A delta is
+    never delivered after its keyframe was dropped. A new buffer likewise
+    starts at a keyframe. Init boxes and anything else are always delivered.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.dropped_bytes = 0
+        self._items: Deque[Tuple[bytes, str]] = deque()  # (data, unit kind)
+        self._size = 0
+        # Deltas are discarded until the next keyframe arrives
+        self._skip_to_key = True
+        self._closed = False
+        self._ready = asyncio.Event()
+        self._last_drop_log = 0.0
+
+    def put(self, data: bytes, kind: str):
+        if self._skip_to_key:
+            if kind == _UNIT_DELTA:
+                self.dropped_bytes += len(data)
+                return
+            if kind == _UNIT_KEY:
+                self._skip_to_key = False
+        self._items.append((data, kind))
+        self._size += len(data)
+        if self._size > self.max_bytes:
+            self._drop_gops()
+        self._ready.set()
+
+    def _drop_gops(self):
+        newest_key = None
+        for i, (_, kind) in enumerate(self._items):
+            if kind == _UNIT_KEY:
+                newest_key = i
+        kept: Deque[Tuple[bytes, str]] = deque()
+        size = 0
+        for i, (data, kind) in enumerate(self._items):
+            if kind in (_UNIT_KEY, _UNIT_DELTA) and (newest_key is None or i < newest_key):
+                self.dropped_bytes += len(data)
+            else:
+                kept.append((data, kind))
+                size += len(data)
+        if size > self.max_bytes:
+            # The newest GOP alone is over budget (or there is no keyframe to resume
+            # from): drop every queued fragment and resume at the next keyframe
+            media = [(data, kind) for data, kind in kept if kind in (_UNIT_KEY, _UNIT_DELTA)]
+            kept = deque(item for item in kept if item[1] not in (_UNIT_KEY, _UNIT_DELTA))
+            for data, _ in media:
+                self.dropped_bytes += len(data)
+                size -= len(data)
+            self._skip_to_key = True
+        self._items = kept
+        self._size = size
+        now = time.monotonic()
+        if now - self._last_drop_log >= 5.0:
+            self._last_drop_log = now
+            logger.warning("[VideoStreamer] Client is falling behind, dropped %d bytes of video so far", self.dropped_bytes)
+
+    def close(self):
+        self._closed = True
+        self._ready.set()
+
+    async def get(self) -> bytes:
+        """Everything buffered so far as one chunk; b'' once closed and drained."""
+        while not self._items:
+            if self._closed:
+                return b""
+            self._ready.clear()
+            await self._ready.wait()
+        data = b"".join(item for item, _ in self._items)
+        self._items.clear()
+        self._size = 0
+        return data
+
+
+class _Mp4Broadcast:
+    """
+    One scrcpy + remux pipeline for a device, fanned out to every MP4 client.
+    
+    Keeps the init segment and the fragments since the last keyframe, so a
+    client joining a running stream can start decoding straight away.
+    """
+
+    def __init__(self, source: AsyncGenerator[bytes, None], max_gop_bytes: int):
+        self.subscribers: Set[_FragmentBuffer] = set()
+        self._init = b""
+        self._gop: List[bytes] = []  # fragments since the last keyframe
+        self._gop_size = 0
+        self._max_gop_bytes = max_gop_bytes
+        self._splitter = _Mp4Splitter()
+        self.task = asyncio.create_task(self._run(source))
+
+    def subscribe(self, max_bytes: int) -> _FragmentBuffer:
+        buffer = _FragmentBuffer(max_bytes)
+        if self._init:
+            buffer.put(self._init, _UNIT_INIT)
+        # The cached GOP starts with its keyframe; without one the buffer waits for the next
+        for i, fragment in enumerate(self._gop):
+            buffer.put(fragment, _UNIT_DELTA if i else _UNIT_KEY)
+        if self.task.done():
+            buffer.close()
+        self.subscribers.add(buffer)
+        return buffer
+
+    async def _run(self, source: AsyncGenerator[bytes, None]):
+        try:
+            async for chunk in source:
+                for data, kind in self._splitter.feed(chunk):
+                    self._publish(data, kind)
+        except Exception as e:
+            logger.error("[VideoStreamer] Error reading MP4 output: %s", e, exc_info=True)
+        finally:
+            # Runs the pipeline's own cleanup (processes, FIFO) if it hasn't finished
+            await source.aclose()
+            for buffer in self.subscribers:
+                buffer.close()
+
+    def _publish(self, data: bytes, kind: str):
+        if kind == _UNIT_INIT:
+            self._init += data
+        elif kind == _UNIT_KEY:
+            self._gop = [data]
+            self._gop_size = len(data)
+        elif kind == _UNIT_DELTA and self._gop:
+            self._gop_size += len(data)
+            if self._gop_size <= self._max_gop_bytes:
+                self._gop.append(data)
+            else:
+                # A GOP this long isn't worth replaying; joiners wait for the next keyframe
+                self._gop = []
+        for buffer in self.subscribers:
+            buffer.put(data, kind)
+
+
+def _close_opened_file(future: asyncio.Future):
+    """Done callback closing the file an open() future produced, if it produced one."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _unblock_fifo_reader(fifo_path: str):
+    """Release a reader still blocked opening the FIFO after its writer went away."""
+    try:
+        # Succeeds only while a reader is waiting; closing right away gives it EOF
+        os.close(os.open(fifo_path, os.O_WRONLY | os.O_NONBLOCK))
+    except OSError:
+        pass
+
 
 class VideoStreamer:
     """Manages H.264 video streaming from scrcpy."""
@@ -20,12 +408,29 @@ class VideoStreamer:
     _instance = None
     
     def __init__(self):
-        self.scrcpy_process: Optional[subprocess.Popen] = None
+        self.scrcpy_process: Optional[asyncio.subprocess.Process] = None
+        # Number of scrcpy video pipelines currently running (each may serve several clients)
+        self.active_streams = 0
+        # Set once scrcpy --version has succeeded; a missing scrcpy is re-probed
+        # on the next stream so installing it doesn't require a restart
+        self._scrcpy_available = False
+        self._ffmpeg_available = False
+        # device_id -> shared MP4 pipeline
+        self._broadcasts: Dict[str, _Mp4Broadcast] = {}
+        # Cancelled pipelines still cleaning up; the loop itself only holds weak references
+        self._stopping: Set[asyncio.Task] = set()
         
         # Stream configuration - Higher quality for better video streaming
         self.max_size = 1080  # Higher resolution (was 720)
         self.bit_rate = 8000000  # 8Mbps for better quality (was 2Mbps)
         self.max_fps = 60
+        # Encoder keyframe interval in seconds: a decodable entry point (and the
+        # end of any artifacts after dropped fragments) at least this often
+        self.i_frame_interval = 1
+        # MediaCodec bitrate mode (0=CQ, 1=VBR, 2=CBR); None keeps the device default
+        self.bitrate_mode: Optional[int] = None
+        # Most MP4 output held for a slow client before old fragments are dropped
+        self.buffer_kb = 1024  # ~1 s at 8Mbps
         
     @classmethod
     def get_instance(cls):
@@ -35,46 +440,154 @@ class VideoStreamer:
     
     def _check_scrcpy_available(self) -> bool:
         """Check if scrcpy is available."""
+        if self._scrcpy_available:
+            return True
         try:
             result = subprocess.run(
                 ["scrcpy", "--version"],
                 capture_output=True,
                 timeout=2
             )
-            return result.returncode == 0
+            self._scrcpy_available = result.returncode == 0
+            return self._scrcpy_available
         except (FileNotFoundError, subprocess.TimeoutExpired):
             return False
     
-    async def generate_mp4_stream(self, device_id: str | None = None) -> AsyncGenerator[bytes, None]:
+    def _check_ffmpeg_available(self) -> bool:
+        """Check if ffmpeg is on PATH (cached once found, like scrcpy)."""
+        if not self._ffmpeg_available:
+            # A PATH lookup is enough here: no process spawn on the stream-open path
+            self._ffmpeg_available = shutil.which("ffmpeg") is not None
+        return self._ffmpeg_available
+    
+    def _codec_options(self) -> str:
+        """MediaCodec options for scrcpy's --video-codec-options."""
+        options = [f"i-frame-interval={self.i_frame_interval}"]
+        if self.bitrate_mode is not None:
+            options.append(f"bitrate-mode={self.bitrate_mode}")
+        return ",".join(options)
+    
+    async def _start_ffmpeg(self, fifo_path: str) -> asyncio.subprocess.Process:
+        """Start ffmpeg remuxing the FIFO to fragmented MP4 on stdout."""
+        # Use ffmpeg to convert H.264 to fragmented MP4
+        # Fragmented MP4 is required for MSE API playback
+        # Read from FIFO instead of stdin
+        ffmpeg_cmd = [
+            "ffmpeg",
+            "-i", fifo_path,  # Read from FIFO (named pipe)
+            "-c:v", "copy",  # Copy video codec (H.264)
+            "-f", "mp4",  # MP4 format
+            "-movflags", _FMP4_MOVFLAGS,
+            "-reset_timestamps", "1",  # Reset timestamps for streaming
+            "-loglevel", "warning",  # Show warnings to debug issues
+            "-flush_packets", "1",  # Force immediate flushing
+            "-fflags", "nobuffer+genpts",  # Disable buffering and generate PTS
+            "-flags", "low_delay",  # Low delay flag
+            "-analyzeduration", "1000000",  # Reduce analysis time
+            "-probesize", "1000000",  # Reduce probe size
+            "pipe:1"  # Output to stdout
+        ]
+        
+        logger.debug("[VideoStreamer] Starting ffmpeg to read from FIFO: %s", " ".join(ffmpeg_cmd))
+        
+        # FIFO behavior: 
+        # - If only reader opens FIFO, it blocks until writer opens
+        # - If only writer opens FIFO, it blocks until reader opens
+        # - Both need to be open for data to flow
+        # so ffmpeg is started right away and scrcpy begins recording once it has opened the FIFO
+        ffmpeg_process = await asyncio.create_subprocess_exec(
+            *ffmpeg_cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        logger.debug("[VideoStreamer] ffmpeg process started (PID: %d)", ffmpeg_process.pid)
+        return ffmpeg_process
+    
+    async def generate_mp4_stream(
+        self,
+        device_id: str | None = None,
+        container: str = "mp4"
+    ) -> AsyncGenerator[bytes, None]:
         """
         Generate fragmented MP4 video stream from scrcpy.
         Uses ffmpeg to convert H.264 to fragmented MP4 for browser playback via MSE API.
         Uses HTTP chunked transfer encoding for streaming.
+        
+        MP4 clients of the same device share one scrcpy + remux pipeline, so the
+        phone encodes once however many viewers there are.
+        
+        With container="mkv", scrcpy's Matroska recording is streamed as-is with no
+        remux step, for clients that play MKV natively (browsers' MSE generally don't).
         """
-        print(f"[VideoStreamer] generate_mp4_stream called, device_id={device_id}", flush=True)
+        logger.debug("[VideoStreamer] generate_mp4_stream called, device_id=%s", device_id)
         
-        if not self._check_scrcpy_available():
-            print("[VideoStreamer] ERROR: scrcpy not available, cannot stream video", flush=True)
+        if not await asyncio.to_thread(self._check_scrcpy_available):
+            logger.error("[VideoStreamer] scrcpy not available, cannot stream video")
+            return
+        
+        # Fail before starting scrcpy if the MP4 remux would need a missing ffmpeg
+        if container == "mp4" and av is None and not self._check_ffmpeg_available():
+            logger.error("[VideoStreamer] ffmpeg not found, cannot convert to MP4")
             return
         
         if not device_id:
             device_id = device_manager.active_device_id
-            print(f"[VideoStreamer] Using active device_id: {device_id}", flush=True)
+            logger.debug("[VideoStreamer] Using active device_id: %s", device_id)
         
         if not device_id:
-            print("[VideoStreamer] ERROR: No device available", flush=True)
+            logger.error("[VideoStreamer] No device available")
+            return
+        
+        if container == "mkv":
+            # An MKV stream can't be joined midway, so each client gets its own pipeline
+            async for chunk in self._stream_pipeline(device_id, container):
+                yield chunk
             return
         
-        print(f"[VideoStreamer] Starting video stream for device: {device_id}", flush=True)
+        broadcast = self._broadcasts.get(device_id)
+        if broadcast is None or broadcast.task.done():
+            broadcast = _Mp4Broadcast(self._stream_pipeline(device_id, "mp4"), self.buffer_kb * 1024)
+            self._broadcasts[device_id] = broadcast
+        else:
+            logger.info("[VideoStreamer] Joining running video stream for device: %s", device_id)
+        buffer = broadcast.subscribe(self.buffer_kb * 1024)
+        try:
+            while True:
+                data = await buffer.get()
+                if not data:
+                    break
+                yield data
+        finally:
+            broadcast.subscribers.discard(buffer)
+            if not broadcast.subscribers:
+                # Last viewer gone: stop scrcpy rather than keep the device encoding
+                broadcast.task.cancel()
+                self._stopping.add(broadcast.task)
+                broadcast.task.add_done_callback(self._stopping.discard)
+                if self._broadcasts.get(device_id) is broadcast:
+                    del self._broadcasts[device_id]
+    
+    async def _stream_pipeline(self, device_id: str, container: str) -> AsyncGenerator[bytes, None]:
+        """Run scrcpy plus the remuxer for one stream and yield its output as it is read."""
+        logger.info("[VideoStreamer] Starting video stream for device: %s", device_id)
         
         scrcpy_process = None
         ffmpeg_process = None
+        scrcpy_log: Optional[_StderrPump] = None
+        ffmpeg_log: Optional[_StderrPump] = None
         fifo_path = None
+        fifo_open: Optional[asyncio.Future] = None
+        fifo_transport: Optional[asyncio.ReadTransport] = None
         
+        self.active_streams += 1
         try:
             # Create named pipe (FIFO) for better data flow control
             # FIFO mode avoids potential deadlock issues with --record=- stdout mode
-            fifo_path = os.path.join(tempfile.gettempdir(), f"scrcpy_video_{device_id or 'default'}_{os.getpid()}.fifo")
+            # Unique per pipeline: a new stream may start while the previous one is still shutting down
+            fifo_path = os.path.join(
+                tempfile.gettempdir(),
+                f"scrcpy_video_{device_id}_{os.getpid()}_{time.monotonic_ns()}.fifo"
+            )
             
             # Remove existing FIFO if any
             if os.path.exists(fifo_path):
@@ -83,9 +596,9 @@ class VideoStreamer:
             # Create FIFO
             try:
                 os.mkfifo(fifo_path)
-                print(f"[VideoStreamer] Created FIFO: {fifo_path}", flush=True)
+                logger.debug("[VideoStreamer] Created FIFO: %s", fifo_path)
             except OSError as e:
-                print(f"[VideoStreamer] Failed to create FIFO {fifo_path}: {e}", flush=True)
+                logger.error("[VideoStreamer] Failed to create FIFO %s: %s", fifo_path, e)
                 return
             
             # Build scrcpy command with FIFO
@@ -98,6 +611,8 @@ class VideoStreamer:
                 "--max-size", str(self.max_size),
                 "--video-bit-rate", str(self.bit_rate),  # Use --video-bit-rate for scrcpy 3.3.4+
                 "--max-fps", str(self.max_fps),
+                "--video-codec=h264",  # The fMP4/MSE path expects H.264
+                "--video-codec-options", self._codec_options(),
                 "--record", fifo_path,  # Output to named pipe (FIFO)
                 "--record-format=mkv",  # Required format for --record in scrcpy 3.3.4+
                 "--no-window",  # Disable window (implies --no-video-playback in scrcpy 3.3.4+)
@@ -106,251 +621,208 @@ class VideoStreamer:
                 # Don't specify --video-encoder, let scrcpy auto-detect the best encoder
             ])
             
-            print(f"[VideoStreamer] Starting video stream with settings: max_size={self.max_size}, bit_rate={self.bit_rate/1000000:.1f}Mbps, max_fps={self.max_fps}", flush=True)
-            print(f"[VideoStreamer] Starting scrcpy with FIFO: {' '.join(scrcpy_cmd)}", flush=True)
+            logger.info(
+                "[VideoStreamer] Starting video stream with settings: max_size=%s, bit_rate=%.1fMbps, max_fps=%s",
+                self.max_size, self.bit_rate / 1000000, self.max_fps
+            )
+            # read() returns whatever is buffered up to this size, so larger chunks mean
+            # fewer reads and HTTP chunks under load without delaying small fragments
+            chunk_size = 65536  # 64KB chunks
+            
+            logger.debug("[VideoStreamer] Starting scrcpy with FIFO: %s", " ".join(scrcpy_cmd))
             
             # Start scrcpy process
-            scrcpy_process = subprocess.Popen(
-                scrcpy_cmd,
-                stdout=subprocess.PIPE,  # Still capture stdout for stderr messages
-                stderr=subprocess.PIPE,
-                bufsize=0,
+            # asyncio subprocesses: pipes are read on the event loop without blocking it
+            scrcpy_process = await asyncio.create_subprocess_exec(
+                *scrcpy_cmd,
+                stdout=asyncio.subprocess.DEVNULL,  # scrcpy logs to stderr; stdout would never be read
+                stderr=asyncio.subprocess.PIPE,
                 env=dict(os.environ, PYTHONUNBUFFERED='1')
             )
+            scrcpy_log = _StderrPump(scrcpy_process, "scrcpy", ready_marker=_RECORDING_STARTED)
             
-            # Give scrcpy time to start and establish connection
-            await asyncio.sleep(3)  # Wait longer for scrcpy to establish connection
-            
-            if scrcpy_process.poll() is not None:
-                stderr = scrcpy_process.stderr.read().decode() if scrcpy_process.stderr else ""
-                print(f"[VideoStreamer] ERROR: scrcpy process exited immediately: {stderr}", flush=True)
-                # Read any remaining stderr
-                if scrcpy_process.stderr:
-                    remaining_stderr = scrcpy_process.stderr.read().decode()
-                    if remaining_stderr:
-                        print(f"[VideoStreamer] scrcpy stderr: {remaining_stderr}", flush=True)
-                # Clean up FIFO on error
-                if fifo_path and os.path.exists(fifo_path):
-                    try:
-                        os.remove(fifo_path)
-                    except:
-                        pass
-                return
+            logger.debug("[VideoStreamer] scrcpy process started (PID: %d), waiting for recording to start...", scrcpy_process.pid)
             
-            # Check if scrcpy is actually outputting data
-            print(f"[VideoStreamer] scrcpy process started (PID: {scrcpy_process.pid}), waiting for data...", flush=True)
+            # Start the reader right away: scrcpy only starts recording once the
+            # FIFO has a reader, so there is nothing to gain by waiting first
+            if container == "mkv":
+                # Pass scrcpy's MKV through untouched; opening blocks until scrcpy opens its end
+                fifo_open = asyncio.ensure_future(asyncio.to_thread(open, fifo_path, "rb", buffering=0))
+                logger.info("[VideoStreamer] Passing MKV through without remuxing")
+            elif av is not None:
+                # Remux in-process: no ffmpeg process, stdout pipe or probe buffering
+                mux_queue = asyncio.Queue()
+                writer = _FMp4Writer(asyncio.get_running_loop(), mux_queue)
+                asyncio.ensure_future(asyncio.to_thread(_mux_fmp4, fifo_path, writer))
+                logger.info("[VideoStreamer] Remuxing FIFO in-process with PyAV %s", av.__version__)
+                read_chunk = mux_queue.get
+            else:
+                ffmpeg_process = await self._start_ffmpeg(fifo_path)
+                ffmpeg_log = _StderrPump(ffmpeg_process, "ffmpeg")
+                read_chunk = lambda: ffmpeg_process.stdout.read(chunk_size)
             
-            # Use ffmpeg to convert H.264 to fragmented MP4
-            # Fragmented MP4 is required for MSE API playback
-            # Read from FIFO instead of stdin
-            ffmpeg_cmd = [
-                "ffmpeg",
-                "-i", fifo_path,  # Read from FIFO (named pipe)
-                "-c:v", "copy",  # Copy video codec (H.264)
-                "-f", "mp4",  # MP4 format
-                "-movflags", "frag_keyframe+empty_moov+default_base_moof",  # Fragmented MP4 for streaming
-                "-reset_timestamps", "1",  # Reset timestamps for streaming
-                "-loglevel", "warning",  # Show warnings to debug issues
-                "-flush_packets", "1",  # Force immediate flushing
-                "-fflags", "nobuffer+genpts",  # Disable buffering and generate PTS
-                "-flags", "low_delay",  # Low delay flag
-                "-analyzeduration", "1000000",  # Reduce analysis time
-                "-probesize", "1000000",  # Reduce probe size
-                "pipe:1"  # Output to stdout
-            ]
-            
-            print(f"[VideoStreamer] Starting ffmpeg to read from FIFO: {' '.join(ffmpeg_cmd)}", flush=True)
-            
-            # IMPORTANT: Start ffmpeg AFTER scrcpy has started
-            # FIFO behavior: 
-            # - If only reader opens FIFO, it blocks until writer opens
-            # - If only writer opens FIFO, it blocks until reader opens
-            # - Both need to be open for data to flow
-            # scrcpy will open FIFO when it's ready to start recording
-            # ffmpeg will block on opening FIFO until scrcpy opens it for writing
-            ffmpeg_process = subprocess.Popen(
-                ffmpeg_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                bufsize=0
-            )
-            
-            # Give ffmpeg time to attempt opening the FIFO
-            # This will block until scrcpy opens the FIFO for writing
-            print(f"[VideoStreamer] Waiting for scrcpy to open FIFO (ffmpeg will block until then)...", flush=True)
-            await asyncio.sleep(2)
+            try:
+                await asyncio.wait_for(scrcpy_log.ready.wait(), timeout=10.0)
+            except asyncio.TimeoutError:
+                pass
+            if not scrcpy_log.matched:
+                # stderr ended or went quiet: give an exiting scrcpy a moment to be reaped
+                try:
+                    await asyncio.wait_for(scrcpy_process.wait(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    logger.warning("[VideoStreamer] No recording-started message from scrcpy, streaming anyway")
             
-            # Check if scrcpy is still running (it should be)
-            if scrcpy_process.poll() is not None:
-                stderr = scrcpy_process.stderr.read().decode() if scrcpy_process.stderr else ""
-                print(f"[VideoStreamer] ERROR: scrcpy process exited before ffmpeg could read: {stderr}", flush=True)
-                # Clean up FIFO on error
-                if fifo_path and os.path.exists(fifo_path):
-                    try:
-                        os.remove(fifo_path)
-                    except:
-                        pass
+            if scrcpy_process.returncode is not None:
+                stderr = await scrcpy_log.tail()
+                logger.error("[VideoStreamer] scrcpy process exited with code %s: %s", scrcpy_process.returncode, stderr)
                 return
             
-            # Check if ffmpeg process is still running
-            if ffmpeg_process.poll() is not None:
-                stderr = ffmpeg_process.stderr.read().decode() if ffmpeg_process.stderr else ""
-                print(f"[VideoStreamer] ERROR: ffmpeg process exited immediately: {stderr}", flush=True)
-                # Also check scrcpy status
-                if scrcpy_process.poll() is not None:
-                    scrcpy_stderr = scrcpy_process.stderr.read().decode() if scrcpy_process.stderr else ""
-                    print(f"[VideoStreamer] scrcpy also exited with code {scrcpy_process.returncode}: {scrcpy_stderr}", flush=True)
-                # Clean up FIFO on error
-                if fifo_path and os.path.exists(fifo_path):
-                    try:
-                        os.remove(fifo_path)
-                    except:
-                        pass
+            if ffmpeg_process and ffmpeg_process.returncode is not None:
+                stderr = await ffmpeg_log.tail()
+                logger.error("[VideoStreamer] ffmpeg process exited immediately: %s", stderr)
                 return
             
-            print(f"[VideoStreamer] ffmpeg process started (PID: {ffmpeg_process.pid}), both processes running, starting to stream data...", flush=True)
+            if fifo_open:
+                try:
+                    fifo_file = await asyncio.wait_for(asyncio.shield(fifo_open), timeout=5.0)
+                except asyncio.TimeoutError:
+                    logger.error("[VideoStreamer] scrcpy did not open the FIFO for recording")
+                    return
+                fifo_reader = asyncio.StreamReader(limit=chunk_size)
+                fifo_transport, _ = await asyncio.get_running_loop().connect_read_pipe(
+                    lambda: asyncio.StreamReaderProtocol(fifo_reader),
+                    fifo_file
+                )
+                read_chunk = lambda: fifo_reader.read(chunk_size)
             
             # Stream MP4 data
-            chunk_size = 8192  # 8KB chunks
             chunks_yielded = 0
-            no_data_count = 0
-            max_no_data_count = 50  # Allow up to 5 seconds of no data (50 * 0.1s)
             try:
-                while ffmpeg_process.poll() is None:
-                    # Check if scrcpy is still running
-                    if scrcpy_process.poll() is not None:
-                        stderr = scrcpy_process.stderr.read().decode() if scrcpy_process.stderr else ""
-                        print(f"[VideoStreamer] ERROR: scrcpy process exited (code {scrcpy_process.returncode}): {stderr}", flush=True)
-                        break
-                    
-                    # Use non-blocking read with timeout
+                # Read until EOF: ffmpeg closes stdout when it exits, including when
+                # scrcpy stops feeding the FIFO, so no per-chunk process checks are needed
+                while True:
                     try:
-                        chunk = await asyncio.wait_for(
-                            asyncio.to_thread(ffmpeg_process.stdout.read, chunk_size),
-                            timeout=5.0
-                        )
+                        chunk = await asyncio.wait_for(read_chunk(), timeout=5.0)
                     except asyncio.TimeoutError:
-                        print(f"[VideoStreamer] Timeout reading from ffmpeg stdout (no data for 5s)", flush=True)
-                        # Check process status
-                        if ffmpeg_process.poll() is not None:
-                            stderr = ffmpeg_process.stderr.read().decode() if ffmpeg_process.stderr else ""
-                            print(f"[VideoStreamer] ffmpeg process exited during timeout: {stderr}", flush=True)
+                        logger.warning("[VideoStreamer] Timeout reading MP4 output (no data for 5s)")
+                        # Check process status; stderr output is echoed by the pumps as it arrives
+                        if ffmpeg_process and ffmpeg_process.returncode is not None:
+                            logger.error("[VideoStreamer] ffmpeg process exited during timeout (code %s)", ffmpeg_process.returncode)
                             break
                         # Check scrcpy status
-                        if scrcpy_process.poll() is not None:
-                            stderr = scrcpy_process.stderr.read().decode() if scrcpy_process.stderr else ""
-                            print(f"[VideoStreamer] scrcpy process exited during timeout (code {scrcpy_process.returncode}): {stderr}", flush=True)
+                        if scrcpy_process.returncode is not None:
+                            logger.error("[VideoStreamer] scrcpy process exited during timeout (code %s)", scrcpy_process.returncode)
                             break
-                        # Check ffmpeg stderr for any warnings/errors
-                        if ffmpeg_process.stderr:
-                            try:
-                                # Try to read stderr without blocking
-                                import select
-                                if select.select([ffmpeg_process.stderr], [], [], 0)[0]:
-                                    stderr_line = ffmpeg_process.stderr.readline().decode().strip()
-                                    if stderr_line:
-                                        print(f"[VideoStreamer] ffmpeg stderr: {stderr_line}", flush=True)
-                            except:
-                                pass
-                        # Check scrcpy stderr
-                        if scrcpy_process.stderr:
-                            try:
-                                import select
-                                if select.select([scrcpy_process.stderr], [], [], 0)[0]:
-                                    stderr_line = scrcpy_process.stderr.readline().decode().strip()
-                                    if stderr_line:
-                                        print(f"[VideoStreamer] scrcpy stderr: {stderr_line}", flush=True)
-                            except:
-                                pass
                         # Continue to check again
                         continue
                     
                     if not chunk:
-                        # No data available, check if process is still running
-                        if ffmpeg_process.poll() is not None:
-                            stderr = ffmpeg_process.stderr.read().decode() if ffmpeg_process.stderr else ""
-                            print(f"[VideoStreamer] ffmpeg process exited: {stderr}", flush=True)
-                            break
-                        # Process still running but no data - wait a bit
-                        no_data_count += 1
-                        if no_data_count >= max_no_data_count:
-                            print(f"[VideoStreamer] WARNING: No data received for {max_no_data_count * 0.1}s, stopping stream", flush=True)
-                            break
-                        await asyncio.sleep(0.1)
-                        continue
+                        # EOF: the remuxer has finished
+                        if ffmpeg_process:
+                            logger.info("[VideoStreamer] ffmpeg output ended")
+                        elif fifo_transport:
+                            logger.info("[VideoStreamer] MKV passthrough ended")
+                        else:
+                            logger.info("[VideoStreamer] PyAV output ended")
+                        if scrcpy_process.returncode is not None:
+                            logger.info("[VideoStreamer] scrcpy exited with code %s", scrcpy_process.returncode)
+                        break
                     
-                    # Reset no_data_count when we receive data
-                    no_data_count = 0
                     chunks_yielded += 1
                     if chunks_yielded == 1:
-                        print(f"[VideoStreamer] ✅ First chunk received ({len(chunk)} bytes), streaming started", flush=True)
+                        logger.info("[VideoStreamer] First chunk received (%d bytes), streaming started", len(chunk))
                     elif chunks_yielded % 100 == 0:
-                        print(f"[VideoStreamer] Streaming: {chunks_yielded} chunks sent", flush=True)
+                        logger.debug("[VideoStreamer] Streaming: %d chunks sent", chunks_yielded)
                     yield chunk
             except asyncio.TimeoutError:
-                print(f"[VideoStreamer] Timeout waiting for data from ffmpeg", flush=True)
+                logger.warning("[VideoStreamer] Timeout waiting for MP4 data")
                 # Check if processes are still running
-                if ffmpeg_process.poll() is not None:
-                    stderr = ffmpeg_process.stderr.read().decode() if ffmpeg_process.stderr else ""
-                    print(f"[VideoStreamer] ffmpeg process exited during timeout: {stderr}", flush=True)
-                if scrcpy_process.poll() is not None:
-                    stderr = scrcpy_process.stderr.read().decode() if scrcpy_process.stderr else ""
-                    print(f"[VideoStreamer] scrcpy process exited during timeout: {stderr}", flush=True)
+                if ffmpeg_process and ffmpeg_process.returncode is not None:
+                    stderr = await ffmpeg_log.tail()
+                    logger.error("[VideoStreamer] ffmpeg process exited during timeout: %s", stderr)
+                if scrcpy_process.returncode is not None:
+                    stderr = await scrcpy_log.tail()
+                    logger.error("[VideoStreamer] scrcpy process exited during timeout: %s", stderr)
             except Exception as e:
-                print(f"[VideoStreamer] Error reading stream: {e}", flush=True)
-                import traceback
-                print(f"[VideoStreamer] Traceback: {traceback.format_exc()}", flush=True)
+                logger.error("[VideoStreamer] Error reading stream: %s", e, exc_info=True)
                 # Check process status
-                if ffmpeg_process.poll() is not None:
-                    stderr = ffmpeg_process.stderr.read().decode() if ffmpeg_process.stderr else ""
-                    print(f"[VideoStreamer] ffmpeg process status: exited with code {ffmpeg_process.returncode}, stderr: {stderr}", flush=True)
-                if scrcpy_process.poll() is not None:
-                    stderr = scrcpy_process.stderr.read().decode() if scrcpy_process.stderr else ""
-                    print(f"[VideoStreamer] scrcpy process status: exited with code {scrcpy_process.returncode}, stderr: {stderr}", flush=True)
+                if ffmpeg_process and ffmpeg_process.returncode is not None:
+                    stderr = await ffmpeg_log.tail()
+                    logger.error("[VideoStreamer] ffmpeg process status: exited with code %s, stderr: %s", ffmpeg_process.returncode, stderr)
+                if scrcpy_process.returncode is not None:
+                    stderr = await scrcpy_log.tail()
+                    logger.error("[VideoStreamer] scrcpy process status: exited with code %s, stderr: %s", scrcpy_process.returncode, stderr)
         except FileNotFoundError:
-            print("[VideoStreamer] ffmpeg not found, cannot convert to MP4", flush=True)
+            logger.error("[VideoStreamer] ffmpeg not found, cannot convert to MP4")
         except Exception as e:
-            print(f"[VideoStreamer] Failed to start streaming: {e}", flush=True)
-            import traceback
-            print(f"[VideoStreamer] Traceback: {traceback.format_exc()}", flush=True)
+            logger.error("[VideoStreamer] Failed to start streaming: %s", e, exc_info=True)
         finally:
-            # Clean up processes
-            if ffmpeg_process:
+            self.active_streams -= 1
+            # Clean up processes, writer first so the remuxer sees EOF on the FIFO
+            if scrcpy_process:
                 try:
-                    ffmpeg_process.terminate()
-                    ffmpeg_process.wait(timeout=2)
+                    scrcpy_process.terminate()
+                    await asyncio.wait_for(scrcpy_process.wait(), timeout=2)
                 except:
                     try:
-                        ffmpeg_process.kill()
+                        scrcpy_process.kill()
                     except:
                         pass
             
-            if scrcpy_process:
+            # A remuxer still blocked opening the FIFO (scrcpy never opened it) is released here
+            if fifo_path and os.path.exists(fifo_path):
+                _unblock_fifo_reader(fifo_path)
+            
+            if fifo_transport:
+                fifo_transport.close()
+            elif fifo_open:
+                # Close the passthrough FIFO file once its (possibly still blocked) open returns
+                fifo_open.add_done_callback(_close_opened_file)
+            
+            if ffmpeg_process:
                 try:
-                    scrcpy_process.terminate()
-                    scrcpy_process.wait(timeout=2)
+                    ffmpeg_process.terminate()
+                    await asyncio.wait_for(ffmpeg_process.wait(), timeout=2)
                 except:
                     try:
-                        scrcpy_process.kill()
+                        ffmpeg_process.kill()
                     except:
                         pass
             
+            for pump in (scrcpy_log, ffmpeg_log):
+                if pump:
+                    pump.cancel()
+            
             # Clean up FIFO
             if fifo_path and os.path.exists(fifo_path):
                 try:
                     os.remove(fifo_path)
-                    print(f"[VideoStreamer] Cleaned up FIFO: {fifo_path}", flush=True)
+                    logger.debug("[VideoStreamer] Cleaned up FIFO: %s", fifo_path)
                 except Exception as e:
-                    print(f"[VideoStreamer] Failed to remove FIFO {fifo_path}: {e}", flush=True)
+                    logger.warning("[VideoStreamer] Failed to remove FIFO %s: %s", fifo_path, e)
     
-    def update_settings(self, max_size: int = None, bit_rate: int = None, max_fps: int = None):
-        """Update streaming settings."""
+    def update_settings(
+        self,
+        max_size: int = None,
+        bit_rate: int = None,
+        max_fps: int = None,
+        buffer_kb: int = None,
+        i_frame_interval: int = None,
+        bitrate_mode: int = None
+    ):
+        """Update streaming settings (applied to the next stream started)."""
         if max_size:
             self.max_size = max_size
         if bit_rate:
             self.bit_rate = bit_rate
         if max_fps:
             self.max_fps = max_fps
+        if buffer_kb:
+            self.buffer_kb = buffer_kb
+        if i_frame_interval:
+            self.i_frame_interval = i_frame_interval
+        if bitrate_mode is not None:
+            self.bitrate_mode = bitrate_mode
 
 
 video_streamer = VideoStreamer.get_instance()
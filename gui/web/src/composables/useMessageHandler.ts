@@ -15,8 +15,10 @@ export function useMessageHandler(
     logs.sort((a, b) => a.timestamp - b.timestamp)
     
     for (const log of logs) {
-      // Prepare screenshot data if present
-      const screenshotData = log.screenshot ? `data:image/jpeg;base64,${log.screenshot}` : null
+      // Prepare screenshot data if present (stored logs reference a URL, not base64)
+      const screenshotData = log.screenshot
+        ? (log.screenshot.startsWith('/') ? log.screenshot : `data:image/jpeg;base64,${log.screenshot}`)
+        : null
       
       if (log.level === 'thought') {
         // Skip empty messages
@@ -29,6 +29,9 @@ export function useScreenStream(
   let fetchController: AbortController | null = null
   
   // WebSocket connection for frame streaming
+  const FRAME_MAGIC = 0x01
+  const FRAME_HEADER_SIZE = 10
+  const FRAME_FLAG_COMPRESSED = 0x01
   let wsConnection: WebSocket | null = null
   let wsReconnectAttempts = 0
   const MAX_RECONNECT_ATTEMPTS = 5
@@ -193,6 +196,7 @@ export function useScreenStream(
     
     try {
       wsConnection = new WebSocket(wsUrl)
+      wsConnection.binaryType = 'arraybuffer' // Frames arrive as binary messages
       
       wsConnection.onopen = () => {
         console.log('[useScreenStream] WebSocket connected for frame streaming')
@@ -218,13 +222,18 @@ export function useScreenStream(
         // This ensures we can receive the next frame immediately
         ;(async () => {
           try {
-            const message = JSON.parse(event.data)
-            if (message.type === 'frame' && message.data) {
-              // Decode base64 frame data
-              let frameBytes = Uint8Array.from(atob(message.data), c => c.charCodeAt(0))
+            if (!(event.data instanceof ArrayBuffer) || event.data.byteLength <= FRAME_HEADER_SIZE) {
+              return
+            }
+            // Binary frame: [magic u8][timestamp_ms u64 LE][flags u8][JPEG bytes]
+            const header = new DataView(event.data, 0, FRAME_HEADER_SIZE)
+            if (header.getUint8(0) === FRAME_MAGIC) {
+              const compressed = (header.getUint8(9) & FRAME_FLAG_COMPRESSED) !== 0
+              const frameTimestamp = Number(header.getBigUint64(1, true))
+              let frameBytes = new Uint8Array(event.data, FRAME_HEADER_SIZE)
               
               // Decompress if data is compressed (non-blocking)
-              if (message.compressed) {
+              if (compressed) {
                 try {
                   // Use native DecompressionStream (Chrome 113+, Firefox 113+)
                   if (typeof window !== 'undefined' && 'DecompressionStream' in window) {
@@ -266,7 +275,7 @@ export function useScreenStream(
               const url = URL.createObjectURL(blob)
               
               // Update frame timestamp - similar to HTTP logic
-              const currentTs = message.timestamp || Date.now()
+              const currentTs = frameTimestamp || Date.now()
               
               // Always update if timestamp is newer, or if it's the same (for continuous updates)
               // This matches HTTP behavior where we update even if timestamp is same
@@ -743,6 +752,13 @@ export function useScreenStream(
           // Append buffer (we already waited if it was updating)
           sourceBuffer.appendBuffer(value)
           chunks_yielded++
+          // The server drops whole GOPs when we fall behind, leaving a gap in the
+          // timeline: jump playback to the newest buffered range instead of stalling
+          const buffered = sourceBuffer.buffered
+          const video = videoElement.value
+          if (video && buffered.length > 1 && video.currentTime < buffered.start(buffered.length - 1)) {
+            video.currentTime = buffered.start(buffered.length - 1)
+          }
           if (chunks_yielded === 1) {
             if (hasReceivedDataRef) {
               hasReceivedDataRef.value = true
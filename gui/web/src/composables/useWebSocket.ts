@@ -78,6 +78,18 @@ export function useWebSocket(
           onStatusMessage(data)
         }
       }
+    } else if (data.type === 'terminal') {
+      // Final log entry and task state delivered in a single message
+      if (!data.taskId) return
+      if (data.message && (!activeTaskId.value || data.taskId === activeTaskId.value)) {
+        if (onLog) onLog({ type: 'log', taskId: data.taskId, level: data.level, message: data.message })
+      }
+      if (data.state) {
+        taskStatuses.value[data.taskId] = data.state
+        if (onStatusUpdate) {
+          onStatusUpdate(data.taskId, data.state)
+        }
+      }
     } else if (data.type === 'interaction') {
       if (onInteraction) {
         onInteraction(data)
@@ -26,6 +26,7 @@ class DeviceInfo:
     connection_type: ConnectionType
     model: str | None = None
     android_version: str | None = None
+    product: str | None = None
 
 
 class ADBConnection:
@@ -152,10 +153,12 @@ class ADBConnection:
 
                     # Parse additional info
                     model = None
+                    product = None
                     for part in parts[2:]:
                         if part.startswith("model:"):
                             model = part.split(":", 1)[1]
-                            break
+                        elif part.startswith("product:"):
+                            product = part.split(":", 1)[1]
                     
                     # Req 3: Unified Device Renaming
                     # Try to get friendly name via getprop
@@ -179,6 +182,7 @@ class ADBConnection:
                             status=status,
                             connection_type=conn_type,
                             model=model,
+                            product=product,
                         )
                     )
 
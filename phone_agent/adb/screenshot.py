@@ -13,6 +13,14 @@ import zlib
 
 from PIL import Image
 
+try:
+    import pybase64
+except ImportError:
+    pybase64 = None  # Fall back to stdlib base64
+
+# SIMD-accelerated encoder when pybase64 is installed; same API as base64.b64encode
+_b64encode = pybase64.b64encode if pybase64 is not None else base64.b64encode
+
 
 @dataclass
 class Screenshot:
@@ -27,6 +35,24 @@ class Screenshot:
     original_height: int | None = None  # Original screen height before resize
 
 
+class _LazyScreenshot(Screenshot):
+    """Screenshot whose base64_data is encoded from jpeg_data on first access.
+
+    Screen streaming only uses the JPEG bytes, so this skips a base64 copy of
+    every captured frame unless a caller actually asks for it.
+    """
+
+    @property
+    def base64_data(self) -> str:
+        if self._base64_data is None:
+            self._base64_data = _b64encode(self.jpeg_data).decode("utf-8")
+        return self._base64_data
+
+    @base64_data.setter
+    def base64_data(self, value: str | None):
+        self._base64_data = value
+
+
 def get_screenshot(device_id: str | None = None, timeout: int = 10, quality: int = 75, max_width: int = 720, preferred_method: str | None = None) -> Screenshot:
     """
     Capture a screenshot from the connected Android device.
@@ -461,10 +487,9 @@ def _process_image(img: Image.Image, width: int, height: int, quality: int, max_
     img.save(buffered, format="JPEG", quality=quality, optimize=False, progressive=False)
     
     jpeg_bytes = buffered.getvalue()
-    base64_data = base64.b64encode(jpeg_bytes).decode("utf-8")
 
-    return Screenshot(
-        base64_data=base64_data, 
+    return _LazyScreenshot(
+        base64_data=None,  # Encoded from jpeg_data on first access
         width=width,  # Actual image width (may be resized)
         height=height,  # Actual image height (may be resized)
         is_sensitive=False,
@@ -17,11 +17,7 @@ def get_screenshot(device_id: str | None = None, timeout: int = 10):
     # We need to store the latest screenshot in DeviceManager for this purpose.
     
     # Check if device exists
-    device = None
-    for d in device_manager.webrtc_devices:
-        if d['id'] == device_id:
-            device = d
-            break
+    device = device_manager.webrtc_devices.get(device_id)
             
     if not device:
         print(f"WebRTC device {device_id} not found")
@@ -80,11 +76,7 @@ def list_devices():
     return []
 
 def _send_command(device_id, cmd_dict):
-    device = None
-    for d in device_manager.webrtc_devices:
-        if d['id'] == device_id:
-            device = d
-            break
+    device = device_manager.webrtc_devices.get(device_id)
     
     if device and device.get('socket'):
         asyncio.run(device['socket'].send_text(json.dumps(cmd_dict)))
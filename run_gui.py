@@ -163,6 +163,14 @@ def run_backend(reload=False, use_https=False):
     # Use uvicorn's default logging - don't modify it to avoid breaking subprocess logging
     # For filtering stream/latest logs, we'll use a simpler approach: just accept the logs
     # or use uvicorn's access_log parameter if needed
+    # uvicorn's loop="auto" (the default) runs on uvloop whenever it is installed,
+    # which uvicorn[standard] does on Linux/macOS; say so since it matters for
+    # WebSocket-heavy frame streaming
+    try:
+        import uvloop  # noqa: F401
+        print("Event loop: uvloop")
+    except ImportError:
+        print("Event loop: asyncio (install uvicorn[standard] for uvloop)")
     if use_https:
         print("Starting Backend on https://0.0.0.0:8000...")
         uvicorn.run(
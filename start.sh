@@ -98,7 +98,7 @@ check_dependencies() {
         echo -e "${YELLOW}警告: 未找到 uvicorn，正在安装 GUI 依赖...${NC}"
         
         # 尝试安装，如果遇到 PEP 668 错误，提供建议
-        if ! python3 -m pip install uvicorn fastapi websockets python-multipart 2>&1 | tee /tmp/pip_install.log | grep -v "already satisfied"; then
+        if ! python3 -m pip install "uvicorn[standard]" fastapi websockets python-multipart 2>&1 | tee /tmp/pip_install.log | grep -v "already satisfied"; then
             if grep -q "externally-managed-environment\|PEP 668" /tmp/pip_install.log 2>/dev/null; then
                 echo -e "${RED}错误: 系统 Python 环境受保护，无法直接安装依赖${NC}"
                 echo -e "${YELLOW}建议解决方案：${NC}"
@@ -106,7 +106,7 @@ check_dependencies() {
                 echo "     python3 -m venv venv"
                 echo "     source venv/bin/activate"
                 echo "     pip install -r requirements.txt"
-                echo "     pip install uvicorn fastapi websockets python-multipart"
+                echo "     pip install 'uvicorn[standard]' fastapi websockets python-multipart"
                 echo ""
                 echo "  2. 或使用 --break-system-packages（不推荐）："
                 echo "     python3 -m pip install --break-system-packages uvicorn fastapi websockets python-multipart"
@@ -147,7 +147,7 @@ check_dependencies() {
         echo "请检查 Python 环境，或使用虚拟环境："
         echo "  python3 -m venv venv"
         echo "  source venv/bin/activate"
-        echo "  pip install uvicorn fastapi websockets python-multipart"
+        echo "  pip install 'uvicorn[standard]' fastapi websockets python-multipart"
         exit 1
     fi
     
@@ -0,0 +1,82 @@
+"""Tests for the per-client MP4 fragment buffer in the video streamer."""
+
+import asyncio
+
+from gui.server.services.video_streamer import (
+    _FragmentBuffer,
+    _UNIT_DELTA,
+    _UNIT_INIT,
+    _UNIT_KEY,
+)
+
+
+def _drain(buffer: _FragmentBuffer) -> bytes:
+    buffer.close()
+    return asyncio.run(buffer.get())
+
+
+def _gop(index: int, deltas: int, size: int = 100):
+    """A keyframe unit followed by deltas, each payload tagged with its GOP and position."""
+    units = [(b"K%02d" % index + b"." * (size - 3), _UNIT_KEY)]
+    for i in range(deltas):
+        units.append((b"D%02d" % index + bytes([i]) + b"." * (size - 4), _UNIT_DELTA))
+    return units
+
+
+def _split(data: bytes, size: int = 100):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def _assert_whole_gops(units):
+    """Every delta must follow its own keyframe, with no delta of that GOP missing before it."""
+    current = None
+    expected = 0
+    for unit in units:
+        if unit.startswith(b"K"):
+            current, expected = unit[1:3], 0
+        else:
+            assert unit.startswith(b"D")
+            assert unit[1:3] == current, "delta delivered without its keyframe"
+            assert unit[3] == expected, "delta delivered after a dropped delta"
+            expected += 1
+
+
+def test_delivered_stream_starts_at_keyframe_after_overflow():
+    buffer = _FragmentBuffer(max_bytes=1000)
+    buffer.put(b"I" * 100, _UNIT_INIT)
+    for index in range(5):
+        for data, kind in _gop(index, deltas=4):
+            buffer.put(data, kind)
+
+    data = _drain(buffer)
+    assert buffer.dropped_bytes > 0
+    assert data.startswith(b"I" * 100)
+    units = _split(data[100:])
+    assert units[0].startswith(b"K")
+    _assert_whole_gops(units)
+
+
+def test_oversized_gop_skips_to_next_keyframe():
+    buffer = _FragmentBuffer(max_bytes=500)
+    for data, kind in _gop(0, deltas=9):
+        buffer.put(data, kind)
+    for data, kind in _gop(1, deltas=2):
+        buffer.put(data, kind)
+
+    units = _split(_drain(buffer))
+    assert units[0].startswith(b"K01")
+    _assert_whole_gops(units)
+
+
+def test_new_buffer_waits_for_keyframe():
+    buffer = _FragmentBuffer(max_bytes=10000)
+    buffer.put(b"I" * 100, _UNIT_INIT)
+    for data, kind in _gop(0, deltas=3)[1:]:
+        buffer.put(data, kind)
+    for data, kind in _gop(1, deltas=2):
+        buffer.put(data, kind)
+
+    data = _drain(buffer)
+    units = _split(data[100:])
+    assert units[0].startswith(b"K01")
+    _assert_whole_gops(units)